@@ -0,0 +1,130 @@
+"""
+Class-wide statistics: distributions, percentile ranks and grade bands.
+
+Each student's average mark is fetched for a course or a batch with one
+grouped query, already sorted by the database. Everything else works on that
+sorted array as a whole: bucket and band counts are bisections, percentiles
+are index lookups and percentile ranks take one step per run of tied values,
+so a 10,000-student batch is described in milliseconds.
+"""
+import math
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+
+from django.db.models import Avg
+
+from .cache import cached
+from .gradebook import GRADE_BANDS
+from .models import Results, Student
+
+# Lower edges of the histogram buckets; the last bucket includes 100
+HISTOGRAM_EDGES = list(range(0, 100, 10))
+SUMMARY_PERCENTILES = (25, 50, 75, 90)
+
+
+def student_averages(results):
+    """``(student_ids, averages)`` for ``results``, ordered by average."""
+    rows = results.values('student_id').annotate(average=Avg('marks')).order_by('average', 'student_id')
+    student_ids, averages = [], []
+    for student_id, average in rows.values_list('student_id', 'average'):
+        student_ids.append(student_id)
+        averages.append(float(average))
+    return student_ids, averages
+
+
+def percentile(values, percent):
+    """Linearly interpolated ``percent`` percentile of the sorted ``values``."""
+    if not values:
+        return None
+    position = (len(values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def count_between(values, edges):
+    """How many sorted ``values`` fall in each ``[edge, next edge)``; the last range is open-ended."""
+    cuts = [bisect_left(values, edge) for edge in edges] + [len(values)]
+    return [cuts[index + 1] - cuts[index] for index in range(len(edges))]
+
+
+def percentile_ranks(student_ids, values):
+    """
+    Percentile rank of each student: the share of the class below them, plus
+    half of those tied with them.
+    """
+    ranks = {}
+    total = len(values)
+    start = 0
+    while start < total:
+        # One step per run of tied values
+        end = bisect_right(values, values[start], start)
+        rank = round((start + end) * 50 / total, 1)
+        for student_id in student_ids[start:end]:
+            ranks[student_id] = rank
+        start = end
+    return ranks
+
+
+def grade_counts(values):
+    """Students per grade, in the bands used by gradebook.grade_for()."""
+    thresholds = [threshold for threshold, _ in reversed(GRADE_BANDS)]
+    grades = ['F'] + [grade for _, grade in reversed(GRADE_BANDS)]
+    counts = count_between(values, [float('-inf')] + thresholds)
+    return [
+        {'grade': grade, 'count': count, 'share': round(count * 100 / len(values), 1) if values else 0}
+        for grade, count in reversed(list(zip(grades, counts)))
+    ]
+
+
+def describe(student_ids, values, ranks=True):
+    """Summary statistics of the sorted ``values``, one per student in ``student_ids``."""
+    count = len(values)
+    mean = math.fsum(values) / count if count else None
+    histogram = count_between(values, HISTOGRAM_EDGES)
+    stats = {
+        'count': count,
+        'mean': mean,
+        'median': percentile(values, 50),
+        'stddev': math.sqrt(math.fsum((value - mean) ** 2 for value in values) / count) if count else None,
+        'min': values[0] if values else None,
+        'max': values[-1] if values else None,
+        'percentiles': {f'p{percent}': percentile(values, percent) for percent in SUMMARY_PERCENTILES},
+        'histogram': [
+            {'label': f'{edge}-{edge + 9}' if edge < HISTOGRAM_EDGES[-1] else f'{edge}-100', 'count': bucket}
+            for edge, bucket in zip(HISTOGRAM_EDGES, histogram)
+        ],
+        'grades': grade_counts(values),
+    }
+    if ranks:
+        stats['ranks'] = percentile_ranks(student_ids, values)
+    return stats
+
+
+def course_stats(course):
+    """Statistics of the students' averages in ``course``, cached until marks change."""
+    return cached(
+        f'class_stats:course:{course.pk}', [Results],
+        lambda: describe(*student_averages(Results.objects.filter(course=course))),
+    )[0]
+
+
+def batch_stats():
+    """Statistics per student batch, averaging each student over all their courses."""
+    def compute():
+        rows = (
+            Results.objects.values('student__batch', 'student_id')
+            .annotate(average=Avg('marks'))
+            .order_by('student__batch', 'average', 'student_id')
+            .values_list('student__batch', 'student_id', 'average')
+        )
+        batches = []
+        for batch, group in groupby(rows, key=lambda row: row[0]):
+            student_ids, averages = [], []
+            for _, student_id, average in group:
+                student_ids.append(student_id)
+                averages.append(float(average))
+            batches.append({'batch': batch, **describe(student_ids, averages, ranks=False)})
+        return batches
+
+    return cached('class_stats:batches', [Results, Student], compute)[0]
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AcademicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'academic'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals, tasks  # noqa: F401
+        from .db import configure_sqlite
+        from .metrics import install_sql_timer
+
+        connection_created.connect(configure_sqlite, dispatch_uid='academic_configure_sqlite')
+        connection_created.connect(install_sql_timer, dispatch_uid='academic_sql_timer')
@@ -0,0 +1,211 @@
+"""
+Requests against every named URL in academic.urls, used by the query-budget
+tests in academic.tests.
+
+Each ViewCase makes one request as a given role, with URL arguments and
+payloads built from the data returned by academic.synthetic.generate(). Its
+budget is the most queries the request may run at any data scale; a view
+that loops over rows shows up as a count that grows between SCALES.
+"""
+import json
+import math
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from . import uploads
+from .enrollment import enrolled_students
+from .models import Assignment, CourseFile, Job, Submission
+from .synthetic import START_DATE
+
+SCALES = {
+    'small': {
+        'students': 20, 'teachers': 2, 'courses': 4, 'courses_per_student': 2,
+        'results': 100, 'attendance': 400, 'submissions': 40,
+    },
+    'large': {
+        'students': 300, 'teachers': 3, 'courses': 6, 'courses_per_student': 3,
+        'results': 2000, 'attendance': 10000, 'submissions': 600,
+    },
+}
+
+PAYLOAD_ROWS = 10
+
+
+class ViewCase:
+    """
+    One request to the URL named ``name``. ``args``, ``query`` and ``body``
+    may be callables taking the generated data; they run before the queries
+    are counted, so any objects they create are not charged to the view.
+    """
+
+    def __init__(self, name, role, budget, method='get', args=None, query=None, body=None,
+                 content_type='application/json', status=200):
+        self.name = name
+        self.role = role
+        self.budget = budget
+        self.method = method
+        self.args = args
+        self.query = query
+        self.body = body
+        self.content_type = content_type
+        self.status = status
+
+    def __repr__(self):
+        return f'ViewCase({self.name!r}, {self.role!r})'
+
+    def resolve(self, value, data):
+        return value(data) if callable(value) else value
+
+    def url(self, data):
+        url = reverse(self.name, args=self.resolve(self.args, data))
+        query = self.resolve(self.query, data)
+        return f'{url}?{urlencode(query)}' if query else url
+
+    def prepare(self, data):
+        """Return the URL and body for one request; call this before counting queries."""
+        body = self.resolve(self.body, data)
+        if self.content_type == 'application/json':
+            body = json.dumps(body)
+        return self.url(data), body
+
+    def send(self, client, url, body):
+        """Send a prepared request and read the whole body, so streamed responses run their queries too."""
+        if self.method == 'get':
+            response = client.get(url)
+        elif self.content_type is None:
+            response = client.post(url, body or {})
+        else:
+            response = client.generic(self.method.upper(), url, body or b'', self.content_type)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+
+def course_students(data):
+    # A fixed-size payload, so write endpoints are compared on equal work at every scale
+    return list(enrolled_students([data['course']]).order_by('id')[:PAYLOAD_ROWS])
+
+
+def marks_payload(data):
+    return {'rows': [
+        {'student_id': student.id, 'course_id': data['course'].id, 'exam_type': 'CA-II', 'marks': 75}
+        for student in course_students(data)
+    ]}
+
+
+def roll_call_payload(data):
+    return {
+        'course': data['course'].id,
+        'date': (START_DATE + timedelta(days=200)).isoformat(),
+        'entries': [{'student_id': student.id, 'status': 'Present'} for student in course_students(data)],
+    }
+
+
+def course_file(data):
+    return CourseFile.objects.create(
+        course=data['course'], file=ContentFile(b'syllabus', name='syllabus.txt'), original_name='syllabus.txt',
+    )
+
+
+def assignment_with_file(data):
+    assignment = Assignment.objects.filter(course=data['course']).first()
+    assignment.file.save('brief.txt', ContentFile(b'assignment brief'))
+    return assignment
+
+
+def own_submission(data):
+    return Submission.objects.create(
+        student=data['student'], assignment=Assignment.objects.filter(course=data['course']).first(),
+        file=ContentFile(b'my answer', name='answer.txt'), original_name='answer.txt',
+    )
+
+
+def upload_session(data, complete=False):
+    assignment = Assignment.objects.filter(course=data['course']).first()
+    session = uploads.start_upload(data['student'].user, 'submission', assignment.id, 'answer.txt', 4)
+    if complete:
+        uploads.append_chunk(session, 0, ContentFile(b'abcd'), 4)
+    return session
+
+
+def finished_job(data):
+    job = Job.objects.create(kind='export_course_stats', created_by=data['admin'], status='succeeded')
+    job.result_file.save('course_statistics.csv', ContentFile(b'Course Code\r\n'))
+    return job
+
+
+VIEW_CASES = [
+    ViewCase('home', None, 0),
+    ViewCase('admin_login', None, 0),
+    ViewCase('teacher_login', None, 0),
+    ViewCase('student_login', None, 0),
+    ViewCase('logout', 'student', 4, status=302),
+
+    ViewCase('admin_dashboard', 'admin', 12),
+    ViewCase('admin_users', 'admin', 4),
+    ViewCase('admin_users_export', 'admin', 3),
+    ViewCase('admin_users_import', 'admin', 3, method='post', content_type=None, status=302, body=lambda data: {
+        'sheet': SimpleUploadedFile('intake.csv', b'username,email,password,role\n'),
+    }),
+    ViewCase('admin_courses', 'admin', 4),
+    ViewCase('admin_announcements', 'admin', 3),
+    ViewCase('admin_reports', 'admin', 11),
+    ViewCase('admin_reports_courses_json', 'admin', 4),
+    ViewCase('admin_reports_export', 'admin', 3),
+    ViewCase('admin_metrics', 'admin', 2),
+    ViewCase('admin_metrics_prometheus', 'admin', 2),
+
+    ViewCase('teacher_dashboard', 'teacher', 8),
+    ViewCase('teacher_results', 'teacher', 10, query=lambda data: {'course': data['course'].id}),
+    ViewCase('teacher_results_save', 'teacher', 9, method='post', body=marks_payload),
+    ViewCase('teacher_results_export', 'teacher', 3, query=lambda data: {'course': data['course'].id}),
+    ViewCase('teacher_attendance', 'teacher', 8, query=lambda data: {'course': data['course'].id}),
+    ViewCase('teacher_attendance_save', 'teacher', 12, method='post', body=roll_call_payload),
+    ViewCase('teacher_attendance_export', 'teacher', 3),
+    ViewCase('teacher_roster', 'teacher', 8, query=lambda data: {'course': data['course'].id, 'grid': 'results'}),
+    ViewCase('teacher_assignments', 'teacher', 7),
+    ViewCase('teacher_course_detail', 'teacher', 4, args=lambda data: [data['course'].id]),
+    ViewCase('teacher_profile', 'teacher', 7),
+    ViewCase('course_marks_series', 'teacher', 4, args=lambda data: [data['course'].id]),
+    ViewCase('course_attendance_series', 'teacher', 4, args=lambda data: [data['course'].id]),
+
+    ViewCase('student_dashboard', 'student', 8),
+    ViewCase('student_results', 'student', 4),
+    ViewCase('student_analytics', 'student', 3),
+    ViewCase('student_marks_series', 'student', 3),
+    ViewCase('student_attendance_series', 'student', 3),
+    ViewCase('student_assignments', 'student', 5),
+    ViewCase('student_attendance', 'student', 4),
+    ViewCase('student_profile', 'student', 7),
+
+    ViewCase('search', 'teacher', 3, query={'q': 'Data'}),
+    ViewCase('course_file_download', 'student', 4, args=lambda data: [course_file(data).id]),
+    ViewCase('assignment_file_download', 'student', 4, args=lambda data: [assignment_with_file(data).id]),
+    ViewCase('submission_file_download', 'student', 3, args=lambda data: [own_submission(data).id]),
+    ViewCase('upload_start', 'student', 4, method='post', status=201, body=lambda data: {
+        'kind': 'submission',
+        'target': Assignment.objects.filter(course=data['course']).first().id,
+        'filename': 'answer.txt',
+        'size': 4,
+    }),
+    ViewCase('upload_status', 'student', 3, args=lambda data: [upload_session(data).pk]),
+    ViewCase('upload_chunk', 'student', 4, method='post', content_type='application/octet-stream',
+             args=lambda data: [upload_session(data).pk], query={'offset': 0}, body=b'abcd'),
+    ViewCase('upload_finalize', 'student', 7, method='post', status=201,
+             args=lambda data: [upload_session(data, complete=True).pk]),
+    ViewCase('job_enqueue', 'admin', 3, method='post', content_type=None, status=202,
+             body={'kind': 'export_course_stats'}),
+    ViewCase('job_status', 'admin', 3, args=lambda data: [finished_job(data).id]),
+    ViewCase('job_download', 'admin', 3, args=lambda data: [finished_job(data).id]),
+]
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
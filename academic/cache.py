@@ -0,0 +1,55 @@
+"""
+Version-stamped caching for expensive, rarely changing query results.
+
+Every cached entry is keyed by the current version stamp of each model it
+was computed from. Writing to a model bumps its stamp (see academic.signals),
+so stale entries are never read again and simply age out of the cache.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+VERSION_KEY = 'academic:version:{}'
+
+# Entries are invalidated by version bumps; the timeout only bounds memory
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def model_version(model):
+    key = VERSION_KEY.format(model._meta.label_lower)
+    # Seed with a timestamp so a stamp lost to eviction never repeats an old one
+    return cache.get_or_set(key, time.time_ns(), timeout=None)
+
+
+def bump_version(*models):
+    """Invalidate every cached entry that depends on any of ``models``."""
+    for model in models:
+        key = VERSION_KEY.format(model._meta.label_lower)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def versioned_key(name, models):
+    stamps = '.'.join(str(model_version(model)) for model in models)
+    return f'academic:{name}:{stamps}'
+
+
+def cached(name, models, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Return ``(value, computed_at)`` for ``compute()``, reusing the cached value
+    while none of ``models`` has been written to since it was computed.
+    """
+    key = versioned_key(name, models)
+    entry = cache.get(key)
+    if entry is None:
+        entry = (compute(), timezone.now())
+        cache.set(key, entry, timeout)
+    return entry
+
+
+def cached_count(queryset, name=None):
+    model = queryset.model
+    return cached(name or f'count:{model._meta.label_lower}', [model], queryset.count)
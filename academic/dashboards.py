@@ -0,0 +1,138 @@
+"""
+Dashboard data loaded with the async ORM.
+
+The queries behind each dashboard are awaited one after another: Django runs
+every async ORM call through sync_to_async on the request's thread-sensitive
+executor, so they would reach the database in sequence even if gathered. The
+win is under ASGI: while a dashboard waits on its queries, the worker's event
+loop keeps serving other requests instead of holding a thread per page load.
+
+The teacher and student dashboards are made of panels whose rendered HTML
+is cached per user (see cached_panel), so a repeat visit runs no queries
+beyond authentication until the data behind a panel changes.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import DEFAULT_TIMEOUT, cached, cached_count, versioned_key
+from .enrollment import enrolled_assignments, enrolled_students
+from .models import (
+    Announcement, Assignment, Attendance, Course, Enrollment, Results, Student, Submission, Teacher, User,
+)
+
+ADMIN_COUNTED_MODELS = {
+    'total_students': Student,
+    'total_teachers': Teacher,
+    'total_courses': Course,
+    'total_assignments': Assignment,
+    'total_submissions': Submission,
+    'total_results': Results,
+    'total_announcements': Announcement,
+}
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def cached_panel(name, owner, models, template, load):
+    """
+    Render the dashboard fragment ``template`` for ``owner`` with the context
+    from ``await load()``. The HTML is cached per owner until any of
+    ``models`` is written to, so a repeat visit skips both the queries and
+    the rendering.
+    """
+    key = versioned_key(f'panel:{name}:{owner._meta.label_lower}:{owner.pk}', models)
+    html = await cache.aget(key)
+    if html is None:
+        html = await sync_to_async(render_to_string)(template, await load())
+        await cache.aset(key, html, DEFAULT_TIMEOUT)
+    return mark_safe(html)
+
+
+async def teacher_stats(teacher):
+    courses = Course.objects.filter(assigned_teacher=teacher)
+    return {
+        'courses_count': await courses.acount(),
+        'students_count': await enrolled_students(courses).acount(),
+        'results_count': await Results.objects.filter(course__in=courses).acount(),
+        'attendance_count': await Attendance.objects.filter(course__in=courses).acount(),
+    }
+
+
+async def teacher_courses(teacher):
+    return {'courses': await alist(Course.objects.filter(assigned_teacher=teacher))}
+
+
+async def teacher_announcements(teacher):
+    return {'announcements': await alist(Announcement.objects.filter(teacher=teacher))}
+
+
+async def teacher_dashboard_data(teacher):
+    return {
+        'stats_panel': await cached_panel(
+            'teacher_stats', teacher, [Course, Enrollment, Student, Results, Attendance],
+            'academic/includes/teacher_stats.html', lambda: teacher_stats(teacher),
+        ),
+        'courses_panel': await cached_panel(
+            'teacher_courses', teacher, [Course],
+            'academic/includes/teacher_courses.html', lambda: teacher_courses(teacher),
+        ),
+        'announcements_panel': await cached_panel(
+            'teacher_announcements', teacher, [Announcement],
+            'academic/includes/teacher_announcements.html', lambda: teacher_announcements(teacher),
+        ),
+    }
+
+
+async def student_overview(student):
+    return {
+        'results_count': await Results.objects.filter(student=student).acount(),
+        'attendance_count': await Attendance.objects.filter(student=student).acount(),
+        'assignments_count': await enrolled_assignments(student).acount(),
+        'submissions_count': await Submission.objects.filter(student=student).acount(),
+    }
+
+
+async def student_recent(student):
+    return {
+        'recent_results': await alist(Results.objects.filter(student=student).select_related('course')[:3]),
+        'recent_submissions': await alist(Submission.objects.filter(student=student).select_related('assignment')[:3]),
+    }
+
+
+async def student_dashboard_data(student):
+    return {
+        'overview_panel': await cached_panel(
+            'student_overview', student, [Results, Attendance, Assignment, Enrollment, Submission],
+            'academic/includes/student_overview.html', lambda: student_overview(student),
+        ),
+        'recent_panel': await cached_panel(
+            'student_recent', student, [Results, Course, Submission, Assignment],
+            'academic/includes/student_recent.html', lambda: student_recent(student),
+        ),
+    }
+
+
+async def admin_dashboard_data():
+    # Counters and recent lists are cached until the underlying tables are written to
+    context = {'stats_as_of': {}}
+    for name, model in ADMIN_COUNTED_MODELS.items():
+        context[name], context['stats_as_of'][name] = await sync_to_async(cached_count)(model.objects.all())
+    recent_students, _ = await sync_to_async(cached)('recent_students', [Student, User], lambda: list(
+        Student.objects.select_related('user').order_by('-user__date_joined')[:5]
+    ))
+    recent_teachers, _ = await sync_to_async(cached)('recent_teachers', [Teacher, User], lambda: list(
+        Teacher.objects.select_related('user').order_by('-joining_date')[:5]
+    ))
+    recent_announcements, _ = await sync_to_async(cached)('recent_announcements', [Announcement, Teacher, User], lambda: list(
+        Announcement.objects.select_related('teacher__user').order_by('-date')[:5]
+    ))
+    context.update({
+        'recent_students': recent_students,
+        'recent_teachers': recent_teachers,
+        'recent_announcements': recent_announcements,
+    })
+    return context
@@ -0,0 +1,18 @@
+"""
+Database connection tuning.
+
+configure_sqlite runs on every new SQLite connection (see AcademicConfig.ready)
+and applies settings.SQLITE_PRAGMAS: WAL lets readers carry on while one
+writer commits, busy_timeout makes concurrent writers wait for the lock
+instead of failing with "database is locked", and the cache and mmap sizes
+keep hot pages in memory. The pragmas go straight to the driver connection,
+so they are not logged or counted as the request's queries.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
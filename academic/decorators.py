@@ -0,0 +1,82 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+from .middleware import get_profile
+
+LOGIN_URLS = {
+    'Admin': 'admin_login',
+    'Teacher': 'teacher_login',
+    'Student': 'student_login',
+}
+
+
+def role_required(role, api=False, pass_profile=False):
+    """
+    Only let users with ``role`` through. Others are redirected to that role's
+    login page, or get a 403 JSON error for ``api`` views. With
+    ``pass_profile`` the view receives the resolved Teacher/Student as its
+    second argument. Works on both sync and async views.
+    """
+    def check(request):
+        user = request.user
+        profile = None
+        if user.is_authenticated and user.role == role:
+            profile = get_profile(request) if pass_profile else True
+        if not profile:
+            if api:
+                return JsonResponse({'error': f'Not a {role.lower()}.'}, status=403), None
+            return redirect(LOGIN_URLS[role]), None
+        return None, profile
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # Resolving the user and profile may hit the session and the database
+                denied, profile = await sync_to_async(check)(request)
+                if denied:
+                    return denied
+                if pass_profile:
+                    return await view(request, profile, *args, **kwargs)
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            denied, profile = check(request)
+            if denied:
+                return denied
+            if pass_profile:
+                return view(request, profile, *args, **kwargs)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def api_login_required(view):
+    """Like login_required, but answers anonymous requests with a 403 JSON error."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Login required.'}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def admin_required(view=None, api=False):
+    decorator = role_required('Admin', api=api)
+    return decorator(view) if view else decorator
+
+
+def teacher_required(view=None, api=False):
+    decorator = role_required('Teacher', api=api, pass_profile=True)
+    return decorator(view) if view else decorator
+
+
+def student_required(view=None, api=False):
+    decorator = role_required('Student', api=api, pass_profile=True)
+    return decorator(view) if view else decorator
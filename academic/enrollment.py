@@ -0,0 +1,38 @@
+from django.db.models import Exists, OuterRef
+
+from .cache import bump_version
+from .models import Assignment, Enrollment, Student, Submission
+
+
+def enrolled_students(courses):
+    """Students enrolled in any of ``courses``, as a semi-join (no DISTINCT needed)."""
+    return Student.objects.filter(
+        id__in=Enrollment.objects.filter(course__in=courses).values('student_id')
+    )
+
+
+def enrolled_assignments(student):
+    return Assignment.objects.filter(
+        course_id__in=Enrollment.objects.filter(student=student).values('course_id')
+    )
+
+
+def pending_assignments(student):
+    """Assignments in the student's courses without a submission, as an anti-join."""
+    submitted = Submission.objects.filter(assignment=OuterRef('pk'), student=student)
+    return enrolled_assignments(student).filter(~Exists(submitted))
+
+
+def bulk_enroll(course, students, batch_size=1000):
+    """Enroll ``students`` in ``course``, skipping existing enrollments. Returns the number of new rows."""
+    before = Enrollment.objects.filter(course=course).count()
+    student_ids = students.values_list('id', flat=True).iterator(chunk_size=batch_size)
+    batch = []
+    for student_id in student_ids:
+        batch.append(Enrollment(student_id=student_id, course=course))
+        if len(batch) >= batch_size:
+            Enrollment.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Enrollment.objects.bulk_create(batch, ignore_conflicts=True)
+    bump_version(Enrollment)
+    return Enrollment.objects.filter(course=course).count() - before
@@ -0,0 +1,140 @@
+import csv
+import tempfile
+from itertools import chain, groupby
+
+import xlsxwriter
+from django.http import FileResponse, StreamingHttpResponse
+
+from .gradebook import EXAM_COLUMNS, grade_for
+from .models import Attendance, Results, User
+from .reports import course_stats_queryset
+
+CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def write_xlsx(output, sheet_name, header, rows):
+    """
+    Write ``rows`` to a single-sheet workbook in ``output``.
+
+    The workbook is built in xlsxwriter's constant_memory mode, which flushes
+    each row to a temporary file as soon as it is written.
+    """
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd'})
+    worksheet = workbook.add_worksheet(sheet_name)
+    bold = workbook.add_format({'bold': True})
+    worksheet.write_row(0, 0, header, bold)
+    for row_num, row in enumerate(rows, start=1):
+        worksheet.write_row(row_num, 0, row)
+    workbook.close()
+
+
+def xlsx_response(filename, sheet_name, header, rows):
+    """Return ``rows`` as a workbook download, spooled to disk rather than held in memory."""
+    output = tempfile.TemporaryFile()
+    write_xlsx(output, sheet_name, header, rows)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def write_csv(output, header, rows):
+    writer = csv.writer(output)
+    writer.writerow(header)
+    writer.writerows(rows)
+
+
+def csv_response(filename, header, rows):
+    """Stream ``rows`` as CSV, encoding each row only when the client asks for it."""
+    writer = csv.writer(Echo())
+    lines = (writer.writerow(row) for row in chain([header], rows))
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+RESULTS_HEADER = [
+    'Student ID', 'Name', 'Class', 'Subject',
+    'CA-I Marks', 'CA-I Date', 'MSE Marks', 'MSE Date', 'CA-II Marks', 'CA-II Date',
+    'Grade',
+]
+
+
+def results_rows(courses):
+    """Yield one pivoted row per (student, course) from a single ordered scan."""
+    marks = (
+        Results.objects.filter(course__in=courses)
+        .order_by('student_id', 'course_id')
+        .values_list(
+            'student_id', 'course_id', 'student__roll_no', 'student__user__username',
+            'student__class_name', 'course__course_name', 'exam_type', 'marks', 'date',
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for _, group in groupby(marks, key=lambda mark: (mark[0], mark[1])):
+        columns = {}
+        for mark in group:
+            columns[EXAM_COLUMNS.get(mark[6])] = (mark[7], mark[8])
+        roll_no, name, class_name, course_name = mark[2:6]
+        row = [roll_no, name, class_name, course_name]
+        marks_list = []
+        for column in EXAM_COLUMNS.values():
+            value, date = columns.get(column, (None, None))
+            row.extend([float(value) if value is not None else None, date])
+            if value is not None:
+                marks_list.append(float(value))
+        row.append(grade_for(sum(marks_list) / len(marks_list) if marks_list else None))
+        yield row
+
+
+ATTENDANCE_HEADER = ['Student', 'Roll No', 'Course', 'Date', 'Status']
+
+
+def attendance_rows(courses):
+    return (
+        Attendance.objects.filter(course__in=courses)
+        .order_by('-date', 'id')
+        .values_list('student__user__username', 'student__roll_no', 'course__course_name', 'date', 'status')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+COURSE_STATS_HEADER = ['Course Code', 'Course Name', 'Teacher', 'Enrolled Students', 'Assignments', 'Submissions']
+
+
+def course_stats_rows():
+    courses = course_stats_queryset().values_list(
+        'course_code', 'course_name', 'assigned_teacher__user__username',
+        'students', 'assignments', 'submissions',
+    )
+    return courses.iterator(chunk_size=CHUNK_SIZE)
+
+
+USERS_HEADER = [
+    'Username', 'Email', 'First Name', 'Last Name', 'Role', 'Active', 'Date Joined',
+    'Employee ID', 'Department', 'Roll No', 'Class', 'Batch',
+]
+
+
+def user_rows(role=None, batch=None):
+    users = User.objects.all()
+    if role:
+        users = users.filter(role=role)
+    if batch:
+        users = users.filter(student__batch=batch)
+    return (
+        users.order_by('id')
+        .values_list(
+            'username', 'email', 'first_name', 'last_name', 'role', 'is_active', 'date_joined',
+            'teacher__employee_id', 'teacher__department',
+            'student__roll_no', 'student__class_name', 'student__batch',
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
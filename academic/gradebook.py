@@ -0,0 +1,174 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from .cache import bump_version
+from .models import Enrollment, Results, Student
+from .stats import refresh_student_stats
+
+# Results.exam_type -> key used by the results grid templates
+EXAM_COLUMNS = {
+    'CA-I': 'cai',
+    'MSE': 'mse',
+    'CA-II': 'caii',
+}
+
+GRADE_BANDS = [
+    (90, 'A'),
+    (80, 'B'),
+    (70, 'C'),
+    (60, 'D'),
+]
+
+# Badge colours for the grade bands; anything else is shown as 'danger'
+GRADE_COLORS = {
+    'A': 'success',
+    'B': 'primary',
+    'C': 'info',
+    'D': 'warning',
+}
+
+
+def grade_for(avg):
+    if avg is None:
+        return 'N/A'
+    for threshold, grade in GRADE_BANDS:
+        if avg >= threshold:
+            return grade
+    return 'F'
+
+
+def load_marks(courses, students=None):
+    """
+    Fetch every (student, course, exam_type) mark for the given courses in a
+    single grouped query.
+    """
+    marks = Results.objects.filter(course__in=courses)
+    if students is not None:
+        marks = marks.filter(student__in=students)
+    return (
+        marks.values('student_id', 'course_id', 'exam_type')
+        .annotate(marks=Max('marks'), date=Max('date'))
+        .order_by('student_id', 'course_id', 'exam_type')
+    )
+
+
+def build_gradebook(courses, students=None):
+    """
+    Return one row per student with CA-I/MSE/CA-II marks pivoted into columns,
+    plus the average and letter grade. Issues two queries regardless of the
+    number of students.
+    """
+    roster = students if students is not None else Student.objects.all()
+    student_rows = roster.values('id', 'roll_no', 'class_name', 'user__username').order_by('roll_no')
+
+    rows = {}
+    for student in student_rows:
+        rows[student['id']] = {
+            'id': student['id'],
+            'roll_no': student['roll_no'],
+            'name': student['user__username'],
+            'class_name': student['class_name'],
+            'results': {},
+        }
+
+    for mark in load_marks(courses, students):
+        row = rows.get(mark['student_id'])
+        column = EXAM_COLUMNS.get(mark['exam_type'])
+        if row is None or column is None:
+            continue
+        row['results'][column] = {'marks': mark['marks'], 'date': mark['date']}
+
+    for row in rows.values():
+        marks_list = [float(r['marks']) for r in row['results'].values()]
+        row['average'] = sum(marks_list) / len(marks_list) if marks_list else None
+        row['grade'] = grade_for(row['average'])
+
+    return list(rows.values())
+
+
+def validate_mark_row(row, course_ids, enrolled):
+    """
+    Return a (Results, errors) pair for one submitted grid row. The Results
+    instance is unsaved and only returned when the row is valid.
+    """
+    errors = {}
+    try:
+        student_id = int(row.get('student_id'))
+    except (TypeError, ValueError):
+        student_id = None
+    try:
+        course_id = int(row.get('course_id'))
+    except (TypeError, ValueError):
+        course_id = None
+    if course_id not in course_ids:
+        errors['course_id'] = 'Not one of your courses.'
+    elif (student_id, course_id) not in enrolled:
+        errors['student_id'] = 'Student is not enrolled in this course.'
+
+    exam_type = row.get('exam_type')
+    if not isinstance(exam_type, str) or exam_type not in EXAM_COLUMNS:
+        errors['exam_type'] = 'Exam type must be one of CA-I, MSE, CA-II.'
+
+    try:
+        marks = Decimal(str(row.get('marks'))).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        marks = None
+    if marks is None or not marks.is_finite() or not Decimal(0) <= marks <= Decimal(100):
+        errors['marks'] = 'Marks must be a number between 0 and 100.'
+
+    date = None
+    if row.get('date'):
+        try:
+            date = parse_date(row['date'])
+        except (TypeError, ValueError):
+            pass
+        if date is None:
+            errors['date'] = 'Date must be in YYYY-MM-DD format.'
+
+    if errors:
+        return None, errors
+    return Results(student_id=student_id, course_id=course_id, exam_type=exam_type, marks=marks, date=date), {}
+
+
+def save_marks(rows, courses, batch_size=500):
+    """
+    Validate and upsert many grid rows at once. Invalid rows are reported by
+    their index in ``rows`` and do not prevent the valid ones from saving.
+    """
+    course_ids = set(courses.values_list('id', flat=True))
+    submitted_ids = set()
+    for row in rows:
+        try:
+            submitted_ids.add(int(row.get('student_id')))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    enrolled = set(
+        Enrollment.objects.filter(course_id__in=course_ids, student_id__in=submitted_ids)
+        .values_list('student_id', 'course_id')
+    )
+
+    # Later rows for the same (student, course, exam_type) win, as in the grid
+    valid = {}
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'errors': {'row': 'Each row must be an object.'}})
+            continue
+        result, row_errors = validate_mark_row(row, course_ids, enrolled)
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+        else:
+            valid[(result.student_id, result.course_id, result.exam_type)] = result
+
+    Results.objects.bulk_create(
+        valid.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student', 'course', 'exam_type'],
+        update_fields=['marks', 'date'],
+    )
+    refresh_student_stats({student_id for student_id, _, _ in valid})
+    bump_version(Results)
+    return len(valid), errors
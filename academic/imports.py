@@ -0,0 +1,256 @@
+"""
+Bulk user import from XLSX or CSV sheets.
+
+Rows are streamed from the sheet (openpyxl in read_only mode for XLSX) and
+checked against sets of the usernames, emails, roll numbers and employee
+IDs already in use, loaded once up front, so validation costs no query per
+row. Password hashing is deliberately slow and dominates the import, so it
+is spread over a process pool. Valid rows are then written with bulk_create
+in batches; every rejected row is reported with its row number and reason.
+"""
+import csv
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from . import workers
+from .cache import bump_version
+from .models import Student, Teacher, User
+
+IMPORT_COLUMNS = [
+    'username', 'email', 'password', 'role', 'first_name', 'last_name',
+    'employee_id', 'department', 'roll_no', 'class_name', 'batch',
+]
+REQUIRED_COLUMNS = ['username', 'email', 'password', 'role']
+LENGTH_CHECKED_COLUMNS = {
+    User: ['username', 'email', 'first_name', 'last_name'],
+    Teacher: ['employee_id', 'department'],
+    Student: ['roll_no', 'class_name', 'batch'],
+}
+IMPORT_ROLES = ('Teacher', 'Student')
+
+IMPORT_BATCH_SIZE = 500
+
+# Below this many passwords, starting worker processes costs more than it saves
+PARALLEL_HASH_THRESHOLD = 200
+HASH_PROGRESS_EVERY = 100
+
+ERRORS_HEADER = ['Row', 'Username', 'Error']
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def normalize_header(cells):
+    return [str(cell or '').strip().lower().replace(' ', '_') for cell in cells]
+
+
+def clean(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheet cells holding roll numbers or employee IDs often come back as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(file, filename):
+    """Yield (row number, dict) for each non-empty data row of an XLSX or CSV sheet."""
+    if filename.lower().endswith('.xlsx'):
+        try:
+            workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError):
+            raise ImportFormatError('The file is not a readable .xlsx workbook.')
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            yield from rows_to_dicts(rows)
+        finally:
+            workbook.close()
+    elif filename.lower().endswith('.csv'):
+        try:
+            yield from rows_to_dicts(csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline='')))
+        except (UnicodeDecodeError, csv.Error):
+            raise ImportFormatError('The file is not a UTF-8 encoded CSV sheet.')
+    else:
+        raise ImportFormatError('Upload an .xlsx or .csv file.')
+
+
+def rows_to_dicts(rows):
+    header = normalize_header(next(iter(rows), []))
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFormatError(f'Missing columns: {", ".join(missing)}.')
+    for row_num, cells in enumerate(rows, start=2):
+        values = {column: clean(cell) for column, cell in zip(header, cells) if column in IMPORT_COLUMNS}
+        if any(values.values()):
+            yield row_num, values
+
+
+class Validator:
+    """Checks rows against existing users and against earlier rows of the same sheet."""
+
+    def __init__(self):
+        self.usernames = set(User.objects.values_list('username', flat=True))
+        self.emails = {email.lower() for email in User.objects.values_list('email', flat=True)}
+        self.roll_nos = set(Student.objects.values_list('roll_no', flat=True))
+        self.employee_ids = set(Teacher.objects.exclude(employee_id=None).values_list('employee_id', flat=True))
+
+    def check(self, row):
+        """Return an error message for ``row``, or None after reserving its unique values."""
+        for column in REQUIRED_COLUMNS:
+            if not row.get(column):
+                return f'{column} is required.'
+        if row['role'] not in IMPORT_ROLES:
+            return f'role must be one of {", ".join(IMPORT_ROLES)}.'
+        for model, columns in LENGTH_CHECKED_COLUMNS.items():
+            for column in columns:
+                max_length = model._meta.get_field(column).max_length
+                if len(row.get(column, '')) > max_length:
+                    return f'{column} is longer than {max_length} characters.'
+        try:
+            validate_email(row['email'])
+        except ValidationError:
+            return 'email is not a valid address.'
+        if row['username'] in self.usernames:
+            return 'username already exists.'
+        if row['email'].lower() in self.emails:
+            return 'email already exists.'
+        if row['role'] == 'Student':
+            if not row.get('roll_no'):
+                return 'roll_no is required for students.'
+            if row['roll_no'] in self.roll_nos:
+                return 'roll_no already exists.'
+            self.roll_nos.add(row['roll_no'])
+        elif row.get('employee_id'):
+            if row['employee_id'] in self.employee_ids:
+                return 'employee_id already exists.'
+            self.employee_ids.add(row['employee_id'])
+        self.usernames.add(row['username'])
+        self.emails.add(row['email'].lower())
+        return None
+
+
+def collect_hashes(hashes, progress):
+    collected = []
+    for password_hash in hashes:
+        collected.append(password_hash)
+        if progress and len(collected) % HASH_PROGRESS_EVERY == 0:
+            progress(len(collected))
+    return collected
+
+
+def hash_passwords(passwords, processes=None, progress=None):
+    """Hash ``passwords`` in order, calling ``progress(done)`` every HASH_PROGRESS_EVERY hashes."""
+    if len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return collect_hashes(map(make_password, passwords), progress)
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=workers.init_process,
+    ) as pool:
+        # Small chunks keep progress reports flowing while a large intake is hashed
+        hashes = pool.map(workers.hash_password, passwords, chunksize=min(HASH_PROGRESS_EVERY, 20))
+        return collect_hashes(hashes, progress)
+
+
+def build_user(row, password_hash):
+    return User(
+        username=row['username'],
+        email=User.objects.normalize_email(row['email']),
+        password=password_hash,
+        role=row['role'],
+        first_name=row.get('first_name', ''),
+        last_name=row.get('last_name', ''),
+    )
+
+
+def build_profile(row, user):
+    if row['role'] == 'Teacher':
+        return Teacher(
+            user=user,
+            employee_id=row.get('employee_id') or None,
+            department=row.get('department') or 'General',
+        )
+    return Student(
+        user=user,
+        roll_no=row['roll_no'],
+        class_name=row.get('class_name') or 'General',
+        batch=row.get('batch') or '2024',
+    )
+
+
+def create_batch(batch):
+    """Insert a batch of (row number, row, hash); return (created, errors)."""
+    try:
+        with transaction.atomic():
+            users = User.objects.bulk_create([build_user(row, password_hash) for _, row, password_hash in batch])
+            profiles = [build_profile(row, user) for (_, row, _), user in zip(batch, users)]
+            Teacher.objects.bulk_create([profile for profile in profiles if isinstance(profile, Teacher)])
+            Student.objects.bulk_create([profile for profile in profiles if isinstance(profile, Student)])
+        return len(batch), []
+    except IntegrityError:
+        pass
+
+    # Someone created a clashing user since validation; retry row by row to find it
+    created, errors = 0, []
+    for row_num, row, password_hash in batch:
+        try:
+            with transaction.atomic():
+                user = build_user(row, password_hash)
+                user.save()
+                build_profile(row, user).save()
+            created += 1
+        except IntegrityError:
+            errors.append((row_num, row['username'], 'username, email or ID was taken during the import.'))
+    return created, errors
+
+
+def import_users(rows, progress=None):
+    """
+    Create users from ``rows`` of (row number, dict). Returns (created, errors)
+    where errors is a list of (row number, username, message).
+    """
+    validator = Validator()
+    valid, errors = [], []
+    for row_num, row in rows:
+        error = validator.check(row)
+        if error:
+            errors.append((row_num, row.get('username', ''), error))
+        else:
+            valid.append((row_num, row))
+    if progress:
+        progress(10, f'Validated {len(valid) + len(errors)} rows; hashing {len(valid)} passwords')
+
+    def hashed(done):
+        if progress:
+            progress(10 + done * 40 // len(valid), f'Hashed {done} of {len(valid)} passwords')
+
+    hashes = hash_passwords([row['password'] for _, row in valid], progress=hashed)
+    if progress:
+        progress(50, f'Creating {len(valid)} users')
+    created = 0
+    for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+        batch = [(row_num, row, password_hash) for (row_num, row), password_hash in zip(
+            valid[start:start + IMPORT_BATCH_SIZE], hashes[start:start + IMPORT_BATCH_SIZE],
+        )]
+        batch_created, batch_errors = create_batch(batch)
+        created += batch_created
+        errors.extend(batch_errors)
+        if progress:
+            done = start + len(batch)
+            progress(50 + done * 50 // len(valid), f'Created {created} of {len(valid)} users')
+    # bulk_create skips the post_save signals that usually invalidate cached counters
+    bump_version(User, Teacher, Student)
+    errors.sort()
+    return created, errors
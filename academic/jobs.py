@@ -0,0 +1,161 @@
+"""
+A small background job queue backed by the Job table.
+
+Views enqueue work with enqueue() and poll the Job row. The run_workers
+management command claims queued jobs and runs them in a thread or process
+pool. Claiming is a conditional UPDATE, so several worker processes can
+share the project database without any external broker. A failing job is
+retried with exponential backoff until it has used max_attempts.
+
+A claimed job holds a lease that its worker renews every
+HEARTBEAT_INTERVAL for as long as the job runs, however long that is and
+whether or not the task reports progress. Only jobs whose lease has run
+out, because their worker died, are put back on the queue.
+
+Task functions live in academic.tasks and are registered with @task.
+"""
+import io
+import tempfile
+import traceback
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+RETRY_BASE_DELAY = timedelta(seconds=30)
+
+LEASE_DURATION = timedelta(minutes=2)
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+
+PROGRESS_EVERY = 1000
+
+
+def task(name, roles=('Admin',), params=None):
+    """
+    Register a task function under ``name``. Users with one of ``roles`` may
+    enqueue it from the web, passing the request parameters named in
+    ``params``, which maps each name to the type its value is parsed as.
+    Tasks with no roles can only be enqueued from code.
+    """
+    def decorator(func):
+        TASKS[name] = {'func': func, 'roles': tuple(roles), 'params': dict(params or {})}
+        return func
+    return decorator
+
+
+def enqueue(kind, user=None, max_attempts=3, **params):
+    if kind not in TASKS:
+        raise ValueError(f'Unknown job kind {kind!r}.')
+    return Job.objects.create(kind=kind, params=params, created_by=user, max_attempts=max_attempts)
+
+
+def set_progress(job, progress, message=''):
+    job.progress = max(0, min(int(progress), 100))
+    job.message = message[:255]
+    Job.objects.filter(pk=job.pk).update(progress=job.progress, message=job.message, updated_at=timezone.now())
+
+
+def iter_with_progress(job, rows, total, label):
+    """Yield ``rows`` unchanged, reporting progress every PROGRESS_EVERY rows."""
+    for done, row in enumerate(rows, start=1):
+        if done % PROGRESS_EVERY == 0:
+            set_progress(job, done * 100 // max(total, 1), f'{label}: {done} of {total}')
+        yield row
+
+
+def save_result_file(job, filename, write, text=False):
+    """Call ``write(output)`` on a temporary file and store it as the job's result."""
+    with tempfile.TemporaryFile() as output:
+        if text:
+            wrapper = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            write(wrapper)
+            wrapper.flush()
+            wrapper.detach()
+        else:
+            write(output)
+        output.seek(0)
+        job.result_file.save(filename, File(output), save=False)
+    Job.objects.filter(pk=job.pk).update(result_file=job.result_file.name)
+
+
+def claim_next(worker):
+    """Mark the oldest runnable job as running for ``worker`` and return its id, or None."""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status='queued', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        # Another worker may claim the same row first; then try the next one
+        claimed = Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker, started_at=now, updated_at=now, attempts=F('attempts') + 1,
+            lease_expires_at=now + LEASE_DURATION,
+        )
+        if claimed:
+            return job_id
+    return None
+
+
+def renew_leases(worker, job_ids):
+    """Extend the leases of the jobs in ``job_ids`` that ``worker`` is still running."""
+    if not job_ids:
+        return 0
+    return Job.objects.filter(pk__in=job_ids, status='running', worker=worker).update(
+        lease_expires_at=timezone.now() + LEASE_DURATION,
+    )
+
+
+def requeue_stale():
+    """Return jobs whose lease has run out to the queue, or fail them if out of attempts."""
+    now = timezone.now()
+    stale = Job.objects.filter(Q(lease_expires_at__lt=now) | Q(lease_expires_at=None), status='running')
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, updated_at=now, message='Worker stopped responding.',
+    )
+    requeued = stale.update(
+        status='queued', worker='', run_after=now, updated_at=now, message='Requeued after the worker stopped responding.',
+    )
+    return requeued, failed
+
+
+def fail(job, error):
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+        Job.objects.filter(pk=job.pk).update(
+            status='queued', worker='', error=error, run_after=now + delay, updated_at=now,
+            message=f'Attempt {job.attempts} failed; retrying.',
+        )
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status='failed', error=error, finished_at=now, updated_at=now, message='Failed.',
+        )
+
+
+def run_job(job_id):
+    """Run one claimed job. Executed inside a worker thread or process."""
+    try:
+        job = Job.objects.get(pk=job_id)
+        spec = TASKS.get(job.kind)
+        try:
+            if spec is None:
+                raise LookupError(f'Unknown job kind {job.kind!r}.')
+            result = spec['func'](job, **job.params)
+        except Exception:
+            fail(job, traceback.format_exc())
+            return
+        now = timezone.now()
+        Job.objects.filter(pk=job.pk).update(
+            status='succeeded', progress=100, message='Finished.', result=result, error='',
+            finished_at=now, updated_at=now,
+        )
+    finally:
+        # Pool threads are reused; don't leave their connections open between jobs
+        connections.close_all()
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academic.models import User
+from academic.synthetic import DEFAULT_COUNTS, SYNTHETIC_PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert a reproducible synthetic institution for benchmarking.'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_COUNTS.items():
+            parser.add_argument(f'--{name.replace("_", "-")}', type=int, default=default)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed and counts give the same data.')
+        parser.add_argument('--prefix', default='syn', help='Prefix for usernames, roll numbers and course codes.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        negative = [name for name in DEFAULT_COUNTS if options[name] < 0]
+        if negative:
+            raise CommandError(f'Counts cannot be negative: {", ".join(negative)}.')
+        if options['courses'] and not options['teachers']:
+            raise CommandError('--courses needs at least one teacher; pass --teachers 1 or more.')
+        if User.objects.filter(username=f'{prefix}_admin').exists():
+            raise CommandError(f'Synthetic data with prefix {prefix!r} already exists; choose another --prefix.')
+        data = generate(
+            seed=options['seed'],
+            prefix=prefix,
+            batch_size=options['batch_size'],
+            **{name: options[name] for name in DEFAULT_COUNTS},
+        )
+        summary = ', '.join(f'{count} {name}' for name, count in data['counts'].items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary}.'))
+        usernames = [data['admin'].username] + [
+            data[role].user.username for role in ('teacher', 'student') if data[role] is not None
+        ]
+        self.stdout.write(f'Log in as {" or ".join(usernames)} with password {SYNTHETIC_PASSWORD!r}.')
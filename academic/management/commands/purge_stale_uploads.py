@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from academic.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that have not received a chunk for the given number of hours.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        purged = purge_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} stale uploads.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from academic.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over courses and announcements.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING('Full-text index not available; search uses LIKE queries.'))
+            return
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} documents.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from academic.models import StudentStats
+from academic.stats import rebuild_all_student_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the StudentStats table from Results and Attendance.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuild_all_student_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {StudentStats.objects.count()} students.'))
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from academic import workers
+from academic.jobs import HEARTBEAT_INTERVAL, claim_next, renew_leases, requeue_stale, run_job
+
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs from the Job table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of jobs to run at once.')
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Run jobs in threads, or in separate processes for CPU-bound work.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        slots = max(1, options['workers'])
+        if options['pool'] == 'process':
+            # spawn, not fork, so children never share the parent's database connections
+            pool = ProcessPoolExecutor(
+                max_workers=slots,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=workers.init_process,
+            )
+            target = workers.run_job
+        else:
+            pool = ThreadPoolExecutor(max_workers=slots)
+            target = run_job
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Worker {name} running {slots} {options["pool"]} slots.')
+
+        # Future -> id of the job it runs
+        running = {}
+        next_stale_check = next_heartbeat = 0
+        try:
+            while True:
+                if time.monotonic() >= next_stale_check:
+                    requeued, failed = requeue_stale()
+                    if requeued or failed:
+                        self.stdout.write(f'Requeued {requeued} and failed {failed} stalled jobs.')
+                    next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+
+                for future in [future for future in running if future.done()]:
+                    running.pop(future)
+                    if future.exception() is not None:
+                        # No longer renewed, so requeue_stale() picks the job up once its lease runs out
+                        self.stderr.write(f'Worker crashed: {future.exception()!r}')
+                if running and time.monotonic() >= next_heartbeat:
+                    renew_leases(name, list(running.values()))
+                    next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL.total_seconds()
+                job_id = claim_next(name) if len(running) < slots else None
+                if job_id is not None:
+                    running[pool.submit(target, job_id)] = job_id
+                    self.stdout.write(f'Started job {job_id}.')
+                    continue
+                if options['once'] and not running:
+                    break
+                time.sleep(options['poll_interval'] if not running else min(options['poll_interval'], 0.2))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping; waiting for running jobs to finish.')
+        finally:
+            pool.shutdown(wait=True)
@@ -0,0 +1,138 @@
+"""
+Permission-checked downloads of uploaded files.
+
+Files are served with strong ETags and Last-Modified, answer conditional
+requests with 304 and single byte ranges with 206. With settings.MEDIA_ACCEL
+set, the body is left to the front proxy (X-Sendfile for Apache/lighttpd,
+X-Accel-Redirect for nginx) and Python only does the permission check.
+"""
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .models import Course, Enrollment
+
+READ_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def can_access_course(user, profile, course_id):
+    if user.role == 'Admin':
+        return True
+    if user.role == 'Teacher' and profile is not None:
+        return Course.objects.filter(id=course_id, assigned_teacher=profile).exists()
+    if user.role == 'Student' and profile is not None:
+        return Enrollment.objects.filter(course_id=course_id, student=profile).exists()
+    return False
+
+
+def file_etag(fieldfile, sha256, size, modified):
+    # Content-addressed files already have a strong validator
+    if sha256:
+        return quote_etag(sha256)
+    key = f'{fieldfile.name}:{size}:{modified.timestamp()}'
+    return quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte positions, inclusive, of a single-range
+    ``Range`` header, None to send the whole file, or False if unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        # Absent, malformed or multi-range: RFC 9110 allows ignoring it
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or int(last) == 0:
+            return False
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            block = file.read(min(READ_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+def serve_file(request, fieldfile, filename=None, sha256='', as_attachment=False):
+    storage = fieldfile.storage
+    size = storage.size(fieldfile.name)
+    modified = storage.get_modified_time(fieldfile.name)
+    etag = file_etag(fieldfile, sha256, size, modified)
+    last_modified = int(modified.timestamp())
+
+    validators = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        # Permission-checked, so never stored by shared caches; revalidating is a cheap 304
+        'Cache-Control': 'private, no-cache',
+    }
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=HttpResponse(headers=validators),
+    )
+    if response.status_code in (304, 412):
+        return response
+
+    filename = filename or fieldfile.name.rsplit('/', 1)[-1]
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    headers = {
+        **validators,
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': content_disposition_header(as_attachment, filename),
+    }
+
+    if settings.MEDIA_ACCEL:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        # Both proxies URL-decode the header, so names with spaces, % or non-ASCII survive
+        if settings.MEDIA_ACCEL == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(fieldfile.name)
+        else:
+            response['X-Sendfile'] = quote(storage.path(fieldfile.name))
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is False:
+        return HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+    if byte_range is None:
+        return FileResponse(
+            storage.open(fieldfile.name, 'rb'),
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type=content_type,
+            headers=headers,
+        )
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        read_range(storage.open(fieldfile.name, 'rb'), start, end - start + 1),
+        status=206,
+        content_type=content_type,
+        headers=headers,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
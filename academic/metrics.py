@@ -0,0 +1,294 @@
+"""
+In-process request metrics.
+
+MetricsMiddleware records, per resolved URL name, the request latency, the
+number of SQL queries and the time spent in them, the template render time
+and the response size. Each goes into a Histogram with fixed buckets, so
+memory stays bounded however many requests are served and recording is a
+bisect plus a few additions under a lock. Percentiles are estimated from
+the buckets the way Prometheus' histogram_quantile does.
+
+SQL is timed by an execute wrapper installed on every new database
+connection, and templates by the TimedDjangoTemplates backend. Both report
+to the RequestStats held in a context variable, which sync_to_async carries
+into the threads that run async views' queries.
+
+Every worker process keeps its own numbers; they are reset on restart.
+Streamed responses are measured until their headers are ready.
+"""
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+current_stats = ContextVar('academic_request_stats', default=None)
+
+
+def log_buckets(start, stop, factor):
+    buckets = []
+    bound = start
+    while bound < stop:
+        buckets.append(round(bound, 6))
+        bound *= factor
+    buckets.append(stop)
+    return buckets
+
+
+# Seconds, from 1ms to 60s in steps of 1.5x
+TIME_BUCKETS = log_buckets(0.001, 60, 1.5)
+COUNT_BUCKETS = [0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 377, 610, 1000]
+# Bytes, from 256B to 64MiB in powers of two
+SIZE_BUCKETS = [2 ** power for power in range(8, 27)]
+
+METRICS = {
+    'latency': ('request_duration_seconds', 'Time to produce the response.', TIME_BUCKETS),
+    'queries': ('request_queries', 'SQL queries per request.', COUNT_BUCKETS),
+    'sql_time': ('request_sql_seconds', 'Time spent in SQL per request.', TIME_BUCKETS),
+    'template_time': ('request_template_seconds', 'Time spent rendering templates per request.', TIME_BUCKETS),
+    'size': ('response_size_bytes', 'Response body size.', SIZE_BUCKETS),
+}
+
+UNRESOLVED = '<unresolved>'
+
+
+class Histogram:
+    """Counts of observations per fixed bucket; the last bucket is unbounded."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percent):
+        """Estimate the ``percent`` percentile by interpolating inside its bucket."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.bounds):
+                    # Past the last bound there is nothing to interpolate towards
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def cumulative(self):
+        total = 0
+        for bound, bucket_count in zip(self.bounds + ['+Inf'], self.counts):
+            total += bucket_count
+            yield bound, total
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.statuses = {}
+        self.started_at = timezone.now()
+
+    def record(self, view, status, values):
+        with self.lock:
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = {name: Histogram(spec[2]) for name, spec in METRICS.items()}
+            for name, value in values.items():
+                if value is not None:
+                    histograms[name].observe(value)
+            key = (view, f'{status // 100}xx')
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def snapshot(self):
+        """Return a consistent copy of the histograms and status counts."""
+        with self.lock:
+            views = {}
+            for view, histograms in self.views.items():
+                views[view] = {}
+                for name, histogram in histograms.items():
+                    copy = Histogram(histogram.bounds)
+                    copy.counts, copy.count, copy.sum = list(histogram.counts), histogram.count, histogram.sum
+                    views[view][name] = copy
+            return views, dict(self.statuses)
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.statuses.clear()
+            self.started_at = timezone.now()
+
+
+registry = Registry()
+
+
+def record_sql(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_time += time.perf_counter() - start
+        stats.queries += 1
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    """connection_created receiver; every connection reports to the current request's stats."""
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time reported to the request metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    return len(response.content)
+
+
+def finish(request, response, stats, start):
+    match = getattr(request, 'resolver_match', None)
+    view = match.url_name or match.view_name if match else UNRESOLVED
+    registry.record(view, response.status_code, {
+        'latency': time.perf_counter() - start,
+        'queries': stats.queries,
+        'sql_time': stats.sql_time,
+        'template_time': stats.template_time,
+        'size': response_size(response),
+    })
+
+
+class MetricsMiddleware:
+    """Record per-view request metrics; list it first so the whole request is timed."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        finish(request, response, stats, start)
+        return response
+
+    async def acall(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        finish(request, response, stats, start)
+        return response
+
+
+def summary(percentiles=(50, 95, 99)):
+    """Rows for the metrics page, busiest view first; times are in milliseconds."""
+    views, statuses = registry.snapshot()
+    rows = []
+    for view, histograms in views.items():
+        row = {
+            'view': view,
+            'requests': histograms['latency'].count,
+            'errors': statuses.get((view, '5xx'), 0),
+        }
+        for name, histogram in histograms.items():
+            scale = 1000 if histogram.bounds is TIME_BUCKETS else 1
+            values = {f'p{percent}': histogram.percentile(percent) for percent in percentiles}
+            values['mean'] = histogram.sum / histogram.count if histogram.count else None
+            row[name] = {key: value * scale if value is not None else None for key, value in values.items()}
+        rows.append(row)
+    rows.sort(key=lambda row: row['requests'], reverse=True)
+    return rows
+
+
+def prometheus_text():
+    """The histograms in the Prometheus text exposition format."""
+    views, statuses = registry.snapshot()
+    lines = []
+    for name, (metric, help_text, _) in METRICS.items():
+        metric = f'academic_{metric}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for view, histograms in sorted(views.items()):
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            histogram = histograms[name]
+            for bound, total in histogram.cumulative():
+                lines.append(f'{metric}_bucket{{view="{label}",le="{bound}"}} {total}')
+            lines.append(f'{metric}_sum{{view="{label}"}} {histogram.sum}')
+            lines.append(f'{metric}_count{{view="{label}"}} {histogram.count}')
+    lines.append('# HELP academic_responses_total Responses by view and status class.')
+    lines.append('# TYPE academic_responses_total counter')
+    for (view, status), total in sorted(statuses.items()):
+        label = view.replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'academic_responses_total{{view="{label}",status="{status}"}} {total}')
+    return '\n'.join(lines) + '\n'
+
+
+def token_allowed(request):
+    """True if the request carries settings.METRICS_TOKEN as a bearer token, for scrapers."""
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    # compare_digest only takes ASCII str, and headers may carry any Latin-1 text
+    return bool(token) and hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
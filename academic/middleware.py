@@ -0,0 +1,62 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+
+from .models import Student, Teacher
+
+PROFILE_MODELS = {
+    'Teacher': Teacher,
+    'Student': Student,
+}
+
+SESSION_KEY = '_academic_profile'
+
+
+def get_profile(request):
+    """
+    Return the Teacher or Student row for ``request.user``, or None.
+
+    The profile id is remembered in the session, so after the first request
+    the instance is built without a query. Its fields other than id and user
+    are deferred and load on first access.
+    """
+    if hasattr(request, '_cached_profile'):
+        return request._cached_profile
+    request._cached_profile = _resolve_profile(request)
+    return request._cached_profile
+
+
+def _resolve_profile(request):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    model = PROFILE_MODELS.get(user.role)
+    if model is None:
+        return None
+
+    cached = request.session.get(SESSION_KEY)
+    if cached and cached[0] == user.pk and cached[1] == user.role:
+        profile = model.from_db(DEFAULT_DB_ALIAS, ['id', 'user_id'], [cached[2], user.pk])
+    else:
+        profile = model.objects.filter(user=user).only('id', 'user_id').first()
+        if profile is None:
+            return None
+        request.session[SESSION_KEY] = [user.pk, user.role, profile.pk]
+    profile.user = user
+    return profile
+
+
+class RoleProfileMiddleware:
+    """Attach a lazily resolved ``request.profile``; must run after AuthenticationMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
+        # Under ASGI this returns the downstream coroutine for the handler to await
+        return self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:39
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_results(apps, schema_editor):
+    # Keep the most recently entered mark for each (student, course, exam_type)
+    Results = apps.get_model('academic', 'Results')
+    keep_ids = (
+        Results.objects.values('student_id', 'course_id', 'exam_type')
+        .annotate(keep_id=Max('id'))
+        .values_list('keep_id', flat=True)
+    )
+    Results.objects.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0009_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='results',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'exam_type'), name='unique_result_per_exam'),
+        ),
+    ]
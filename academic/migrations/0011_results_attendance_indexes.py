@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:42
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # Keep the most recently marked status for each (student, course, date)
+    Attendance = apps.get_model('academic', 'Attendance')
+    keep_ids = (
+        Attendance.objects.values('student_id', 'course_id', 'date')
+        .annotate(keep_id=Max('id'))
+        .values_list('keep_id', flat=True)
+    )
+    Attendance.objects.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0010_results_unique_exam'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'status'], name='attendance_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='results',
+            index=models.Index(fields=['student', 'exam_type'], name='results_student_exam_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='results',
+            index=models.Index(fields=['course', 'student', 'exam_type'], name='results_course_student_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
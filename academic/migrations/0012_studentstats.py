@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0011_results_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='academic.student')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('attendance_count', models.PositiveIntegerField(default=0)),
+                ('internal_marks_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('internal_marks_count', models.PositiveIntegerField(default=0)),
+                ('final_marks_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('final_marks_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def enroll_existing_students(apps, schema_editor):
+    # Everyone with marks, attendance or a submission in a course is enrolled in it
+    Enrollment = apps.get_model('academic', 'Enrollment')
+    Results = apps.get_model('academic', 'Results')
+    Attendance = apps.get_model('academic', 'Attendance')
+    Submission = apps.get_model('academic', 'Submission')
+    pairs = set(Results.objects.values_list('student_id', 'course_id').distinct())
+    pairs |= set(Attendance.objects.values_list('student_id', 'course_id').distinct())
+    pairs |= set(Submission.objects.values_list('student_id', 'assignment__course_id').distinct())
+    Enrollment.objects.bulk_create(
+        [Enrollment(student_id=student_id, course_id=course_id) for student_id, course_id in pairs],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0013_keyset_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrolled_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['student', 'assignment'], name='submission_student_assign_idx'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='academic.course'),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='academic.student'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'student'], name='enrollment_course_student_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment'),
+        ),
+        migrations.RunPython(enroll_existing_students, migrations.RunPython.noop),
+    ]
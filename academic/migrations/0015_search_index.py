@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# Frozen copies of academic.search.TABLE and its rowid scheme (course 0, announcement 1)
+TABLE = 'academic_search'
+KIND_COUNT = 2
+
+
+def doc_rowid(kind_code, object_id):
+    return object_id * KIND_COUNT + kind_code
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "title, body, tokenize = 'porter unicode61')"
+        )
+    except Exception:
+        # SQLite compiled without FTS5; search uses the LIKE fallback
+        return
+    Course = apps.get_model('academic', 'Course')
+    Announcement = apps.get_model('academic', 'Announcement')
+    rows = [
+        (doc_rowid(0, course.id), f'{course.course_code} {course.course_name}',
+         f'{course.material}\n{course.syllabus}')
+        for course in Course.objects.all()
+    ]
+    rows += [
+        (doc_rowid(1, announcement.id), '', announcement.message)
+        for announcement in Announcement.objects.all()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0014_enrollment'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0015_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['class_name', 'batch'], name='student_class_batch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['batch'], name='student_batch_idx'),
+        ),
+    ]
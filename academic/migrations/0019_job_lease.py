@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0018_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0019_job_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='finalizing',
+            field=models.BooleanField(default=False),
+        ),
+    ]
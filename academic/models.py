@@ -1,5 +1,8 @@
+import uuid
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.db import models
+from django.utils import timezone
 
 class UserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **extra_fields):
@@ -34,6 +37,11 @@ class User(AbstractBaseUser):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date_joined', '-id'], name='user_date_joined_idx'),
+        ]
+
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email']
 
@@ -60,6 +68,13 @@ class Student(models.Model):
     date_of_birth = models.DateField(null=True, blank=True)
     batch = models.CharField(max_length=50)
 
+    class Meta:
+        indexes = [
+            # roll_no prefix searches use the unique index as a range scan
+            models.Index(fields=['class_name', 'batch'], name='student_class_batch_idx'),
+            models.Index(fields=['batch'], name='student_batch_idx'),
+        ]
+
     def __str__(self):
         return self.user.username
 
@@ -73,6 +88,22 @@ class Course(models.Model):
     def __str__(self):
         return self.course_name
 
+class Enrollment(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    enrolled_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'student'], name='enrollment_course_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.course}"
+
 class Results(models.Model):
     EXAM_TYPE_CHOICES = [
         ('CA-I', 'CA-I'),
@@ -85,6 +116,15 @@ class Results(models.Model):
     exam_type = models.CharField(max_length=10, choices=EXAM_TYPE_CHOICES)
     date = models.DateField(default=None, null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course', 'exam_type'], name='unique_result_per_exam'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'exam_type'], name='results_student_exam_idx'),
+            models.Index(fields=['course', 'student', 'exam_type'], name='results_course_student_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.course} - {self.exam_type}"
 
@@ -92,6 +132,9 @@ class CourseFile(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     file = models.FileField(upload_to='course_files/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Set for chunked uploads, whose file lives under its content hash
+    sha256 = models.CharField(max_length=64, blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return self.file.name
@@ -106,6 +149,17 @@ class Attendance(models.Model):
     date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course', 'date'], name='unique_attendance_per_day'),
+        ]
+        indexes = [
+            # Covers COUNT(*) ... WHERE student_id = ? AND status = ? without touching the table
+            models.Index(fields=['student', 'status'], name='attendance_student_status_idx'),
+            models.Index(fields=['course', 'date'], name='attendance_course_date_idx'),
+            models.Index(fields=['-date', '-id'], name='attendance_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.course} - {self.date}"
 
@@ -114,6 +168,11 @@ class Announcement(models.Model):
     message = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='announcement_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.teacher.user.username} - {self.date}"
 
@@ -133,6 +192,8 @@ class Submission(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     file = models.FileField(upload_to='submissions/')
     submitted_at = models.DateTimeField(auto_now_add=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
     feedback = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=[
         ('Pending', 'Pending'),
@@ -140,5 +201,107 @@ class Submission(models.Model):
         ('Graded', 'Graded'),
     ], default='Pending')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'assignment'], name='submission_student_assign_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.assignment}"
+
+class UploadSession(models.Model):
+    """An in-progress chunked upload; see academic.uploads."""
+    KIND_CHOICES = [
+        ('submission', 'Submission'),
+        ('course_file', 'Course File'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Assignment id for submissions, Course id for course files
+    target_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    # Set by the one request that gets to finalize the upload
+    finalizing = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+class Job(models.Model):
+    """A unit of background work run by the run_workers command; see academic.jobs."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/', blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Renewed by the worker while the job runs; see jobs.requeue_stale()
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+class StudentStats(models.Model):
+    """Denormalized attendance and marks totals, kept in sync by academic.stats."""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    present_count = models.PositiveIntegerField(default=0)
+    attendance_count = models.PositiveIntegerField(default=0)
+    internal_marks_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    internal_marks_count = models.PositiveIntegerField(default=0)
+    final_marks_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    final_marks_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def attendance_percentage(self):
+        return self.present_count / self.attendance_count * 100 if self.attendance_count else 0
+
+    @property
+    def internal_average(self):
+        return self.internal_marks_sum / self.internal_marks_count if self.internal_marks_count else 0
+
+    @property
+    def final_average(self):
+        return self.final_marks_sum / self.final_marks_count if self.final_marks_count else 0
+
+    @property
+    def results_count(self):
+        return self.internal_marks_count + self.final_marks_count
+
+    @property
+    def marks_average(self):
+        total = self.internal_marks_sum + self.final_marks_sum
+        return float(total) / self.results_count if self.results_count else 0
+
+    def __str__(self):
+        return f"Stats for {self.student}"
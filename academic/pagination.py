@@ -0,0 +1,115 @@
+"""
+Keyset (seek) pagination.
+
+Pages are addressed by the (sort value, id) of their boundary row instead of
+an OFFSET, so fetching any page is an index range scan of page_size rows no
+matter how deep into the table it is.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+        value, pk = field.to_python(value), int(pk)
+    except (ValueError, TypeError, OverflowError, ValidationError):
+        return None
+    # Anything the database could not compare against is treated as no cursor
+    if value is None or not 0 < pk < 2 ** 63:
+        return None
+    return value, pk
+
+
+class KeysetPage:
+    def __init__(self, object_list, page_size, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def keyset_paginate(queryset, field_name, after=None, before=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of ``queryset`` ordered newest first by ``field_name``,
+    then by id. ``after``/``before`` are cursors taken from a previous page.
+    """
+    field = queryset.model._meta.get_field(field_name)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    def boundary(row):
+        return encode_cursor(getattr(row, field_name), row.pk)
+
+    before_key = decode_cursor(before, field) if before else None
+    if before_key is not None:
+        value, pk = before_key
+        rows = list(
+            queryset.filter(Q(**{f'{field_name}__gt': value}) | Q(**{field_name: value, 'pk__gt': pk}))
+            .order_by(field_name, 'pk')[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(
+            rows,
+            page_size,
+            next_cursor=boundary(rows[-1]) if rows else None,
+            previous_cursor=boundary(rows[0]) if has_previous else None,
+        )
+
+    after_key = decode_cursor(after, field) if after else None
+    if after_key is not None:
+        value, pk = after_key
+        queryset = queryset.filter(Q(**{f'{field_name}__lt': value}) | Q(**{field_name: value, 'pk__lt': pk}))
+    rows = list(queryset.order_by(f'-{field_name}', '-pk')[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        page_size,
+        next_cursor=boundary(rows[-1]) if has_next else None,
+        previous_cursor=boundary(rows[0]) if after_key is not None and rows else None,
+    )
+
+
+def keyset_page_from_request(request, queryset, field_name, default_page_size=DEFAULT_PAGE_SIZE):
+    try:
+        page_size = int(request.GET.get('page_size', default_page_size))
+    except ValueError:
+        page_size = default_page_size
+    return keyset_paginate(
+        queryset,
+        field_name,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=page_size,
+    )
@@ -0,0 +1,31 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Assignment, Course, Enrollment, Submission
+
+COURSE_STATS_SORTS = ['course_code', 'course_name', 'students', 'assignments', 'submissions']
+
+
+def count_subquery(queryset, group_field):
+    totals = queryset.order_by().values(group_field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(totals.values('total'), output_field=IntegerField()), 0)
+
+
+def course_stats_queryset(sort='course_code'):
+    """
+    Every course annotated with its enrolled students, assignments and
+    submissions, computed as correlated subqueries in a single query.
+    """
+    if sort.lstrip('-') not in COURSE_STATS_SORTS:
+        sort = 'course_code'
+    return (
+        Course.objects.select_related('assigned_teacher__user')
+        .annotate(
+            students=count_subquery(Enrollment.objects.filter(course=OuterRef('pk')), 'course'),
+            assignments=count_subquery(Assignment.objects.filter(course=OuterRef('pk')), 'course'),
+            submissions=count_subquery(
+                Submission.objects.filter(assignment__course=OuterRef('pk')), 'assignment__course',
+            ),
+        )
+        .order_by(sort, 'id')
+    )
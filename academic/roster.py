@@ -0,0 +1,45 @@
+"""
+Server-side search and paging for the teacher roster grids.
+
+The results and attendance grids render one page of students and fetch the
+next page, or a filtered one, from the teacher_roster view instead of
+hiding rows in the browser.
+"""
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+ROSTER_PAGE_SIZE = 50
+
+# Sorts after every other character, so [prefix, prefix + PREFIX_END) holds
+# exactly the strings starting with prefix
+PREFIX_END = '\U0010ffff'
+
+
+def prefix_range(field, prefix):
+    """
+    Match values starting with ``prefix`` as a range, which any B-tree index
+    on ``field`` can answer (LIKE 'x%' cannot use SQLite's default indexes).
+    """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END})
+
+
+def filter_roster(students, query='', class_name=''):
+    """Narrow ``students`` to a class and to rows matching every word of ``query``."""
+    if class_name:
+        students = students.filter(class_name=class_name)
+    for term in query.split():
+        students = students.filter(
+            prefix_range('roll_no', term) | prefix_range('roll_no', term.upper())
+            | prefix_range('user__username', term)
+            | Q(user__first_name__istartswith=term) | Q(user__last_name__istartswith=term)
+            | Q(class_name__istartswith=term)
+        )
+    return students
+
+
+def roster_page(students, page_number, per_page=ROSTER_PAGE_SIZE):
+    return Paginator(students.order_by('roll_no'), per_page).get_page(page_number)
+
+
+def class_choices(students):
+    return list(students.order_by('class_name').values_list('class_name', flat=True).distinct())
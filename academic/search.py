@@ -0,0 +1,195 @@
+"""
+Full-text search over course material, syllabi and announcements.
+
+On SQLite the documents live in an FTS5 virtual table (created by migration
+0015) and are ranked with bm25(). On other databases, or SQLite builds
+without FTS5, search falls back to unranked icontains filters. The index is
+kept in sync by the signal handlers in academic.signals.
+"""
+import re
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Q
+
+from .models import Announcement, Course
+
+TABLE = 'academic_search'
+
+# Documents are keyed by rowid so updates and deletes are point lookups;
+# migration 0015 keeps a frozen copy of this scheme
+KINDS = {
+    'course': 0,
+    'announcement': 1,
+}
+KIND_COUNT = len(KINDS)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+# Whether each database has the FTS table, by NAME; cleared after migrate
+_fts_databases = {}
+
+
+def fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_databases:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE])
+            _fts_databases[name] = cursor.fetchone() is not None
+    return _fts_databases[name]
+
+
+def reset_fts_available(**kwargs):
+    """post_migrate receiver; migrations are what create and drop the FTS table."""
+    _fts_databases.clear()
+
+
+def doc_rowid(kind, object_id):
+    return object_id * KIND_COUNT + KINDS[kind]
+
+
+def parse_rowid(rowid):
+    kind_code = rowid % KIND_COUNT
+    kind = next(name for name, code in KINDS.items() if code == kind_code)
+    return kind, rowid // KIND_COUNT
+
+
+def course_document(course):
+    title = f'{course.course_code} {course.course_name}'
+    return title, f'{course.material}\n{course.syllabus}'
+
+
+def announcement_document(announcement):
+    return '', announcement.message
+
+
+def index_document(kind, object_id, title, body):
+    if not fts_available():
+        return
+    rowid = doc_rowid(kind, object_id)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(f'INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)', [rowid, title, body])
+
+
+def remove_document(kind, object_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [doc_rowid(kind, object_id)])
+
+
+def rebuild_index(batch_size=1000):
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        total = 0
+        sources = [
+            ('course', Course.objects.only('id', 'course_code', 'course_name', 'material', 'syllabus'),
+             course_document),
+            ('announcement', Announcement.objects.only('id', 'message'), announcement_document),
+        ]
+        for kind, queryset, document in sources:
+            rows = []
+            for obj in queryset.iterator(chunk_size=batch_size):
+                rows.append((doc_rowid(kind, obj.id), *document(obj)))
+                if len(rows) >= batch_size:
+                    cursor.executemany(f'INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+                    total += len(rows)
+                    rows = []
+            cursor.executemany(f'INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+            total += len(rows)
+    return total
+
+
+def match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the last
+    one is treated as a prefix so results appear while the user is typing.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(query, limit=20, offset=0, courses=None, announcements=None):
+    """
+    Return ``(hits, has_more)`` where each hit is a dict with kind, id, title
+    and snippet, best match first. ``courses`` and ``announcements`` limit
+    the hits to those querysets; None leaves a kind unrestricted.
+    """
+    if fts_available():
+        return _search_fts(query, limit, offset, courses, announcements)
+    return _search_like(query, limit, offset, courses, announcements)
+
+
+def scope_clause(courses, announcements):
+    """SQL restricting the FTS rowids to the given querysets, with its params."""
+    clauses, params = [], []
+    for kind, queryset in (('course', courses), ('announcement', announcements)):
+        if queryset is None:
+            clauses.append(f'rowid % {KIND_COUNT} = {KINDS[kind]}')
+            continue
+        try:
+            sql, query_params = queryset.order_by().values('id').query.sql_with_params()
+        except EmptyResultSet:
+            continue
+        clauses.append(f'rowid IN (SELECT id * {KIND_COUNT} + {KINDS[kind]} FROM ({sql}))')
+        params.extend(query_params)
+    return ' OR '.join(clauses) or '0', params
+
+
+def _search_fts(query, limit, offset, courses, announcements):
+    expression = match_expression(query)
+    if expression is None:
+        return [], False
+    scope, scope_params = '1', []
+    if courses is not None or announcements is not None:
+        scope, scope_params = scope_clause(courses, announcements)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, title, snippet({TABLE}, 1, '[', ']', '...', 12) FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s AND ({scope}) ORDER BY bm25({TABLE}, 5.0, 1.0) LIMIT %s OFFSET %s",
+            [expression, *scope_params, limit + 1, offset],
+        )
+        rows = cursor.fetchall()
+    hits = []
+    for rowid, title, snippet in rows[:limit]:
+        kind, object_id = parse_rowid(rowid)
+        hits.append({'kind': kind, 'id': object_id, 'title': title, 'snippet': snippet})
+    return hits, len(rows) > limit
+
+
+def _search_like(query, limit, offset, courses, announcements):
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return [], False
+    course_filter = Q()
+    announcement_filter = Q()
+    for token in tokens:
+        course_filter &= (
+            Q(course_code__icontains=token) | Q(course_name__icontains=token)
+            | Q(material__icontains=token) | Q(syllabus__icontains=token)
+        )
+        announcement_filter &= Q(message__icontains=token)
+    # Fetch enough of each kind to fill the requested window
+    window = offset + limit + 1
+    courses = (Course.objects.all() if courses is None else courses).filter(course_filter).order_by('-id')[:window]
+    announcements = (
+        Announcement.objects.all() if announcements is None else announcements
+    ).filter(announcement_filter).order_by('-id')[:window]
+    hits = []
+    for course in courses:
+        title, body = course_document(course)
+        hits.append({'kind': 'course', 'id': course.id, 'title': title, 'snippet': body[:200]})
+    for announcement in announcements:
+        hits.append({'kind': 'announcement', 'id': announcement.id, 'title': '', 'snippet': announcement.message[:200]})
+    page = hits[offset:offset + limit + 1]
+    return page[:limit], len(page) > limit
@@ -0,0 +1,76 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .search import (
+    announcement_document, course_document, index_document, remove_document, reset_fts_available,
+)
+from .models import (
+    Announcement, Assignment, Attendance, Course, Enrollment, Results, Student, Submission, Teacher, User,
+)
+from .stats import apply_delta, attendance_deltas, refresh_student_stats, result_deltas
+
+
+VERSIONED_MODELS = [
+    User, Teacher, Student, Course, Enrollment, Results, Attendance, Announcement, Assignment, Submission,
+]
+
+
+def bump_model_version(sender, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no cached value depends on
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_version(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_model_version, sender=model, dispatch_uid=f'bump_version_save_{model.__name__}')
+    post_delete.connect(bump_model_version, sender=model, dispatch_uid=f'bump_version_delete_{model.__name__}')
+
+post_migrate.connect(reset_fts_available, dispatch_uid='reset_fts_available')
+
+
+@receiver(post_save, sender=Results)
+def results_saved(sender, instance, created, **kwargs):
+    if created:
+        apply_delta(instance.student_id, **result_deltas(instance, 1))
+    else:
+        refresh_student_stats([instance.student_id])
+
+
+@receiver(post_delete, sender=Results)
+def results_deleted(sender, instance, **kwargs):
+    apply_delta(instance.student_id, create_missing=False, **result_deltas(instance, -1))
+
+
+@receiver(post_save, sender=Attendance)
+def attendance_saved(sender, instance, created, **kwargs):
+    if created:
+        apply_delta(instance.student_id, **attendance_deltas(instance, 1))
+    else:
+        refresh_student_stats([instance.student_id])
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_deleted(sender, instance, **kwargs):
+    apply_delta(instance.student_id, create_missing=False, **attendance_deltas(instance, -1))
+
+
+@receiver(post_save, sender=Course)
+def course_indexed(sender, instance, **kwargs):
+    index_document('course', instance.id, *course_document(instance))
+
+
+@receiver(post_delete, sender=Course)
+def course_unindexed(sender, instance, **kwargs):
+    remove_document('course', instance.id)
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_indexed(sender, instance, **kwargs):
+    index_document('announcement', instance.id, *announcement_document(instance))
+
+
+@receiver(post_delete, sender=Announcement)
+def announcement_unindexed(sender, instance, **kwargs):
+    remove_document('announcement', instance.id)
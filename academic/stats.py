@@ -0,0 +1,125 @@
+"""
+Maintenance of the denormalized StudentStats table.
+
+Single-row writes to Results and Attendance adjust the affected row in place
+through the signal handlers in academic.signals. Bulk writes bypass signals,
+so code using bulk_create/bulk_update must call refresh_student_stats() with
+the ids of the students it touched.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+
+from .cache import bump_version
+from .models import Attendance, Results, Student, StudentStats
+
+INTERNAL_EXAMS = ['CA-I', 'CA-II']
+FINAL_EXAMS = ['MSE']
+
+STATS_FIELDS = [
+    'present_count', 'attendance_count',
+    'internal_marks_sum', 'internal_marks_count',
+    'final_marks_sum', 'final_marks_count',
+]
+
+
+def refresh_student_stats(student_ids, batch_size=500):
+    """Recompute StudentStats from the raw rows for the given students."""
+    student_ids = list(student_ids)
+    for start in range(0, len(student_ids), batch_size):
+        _refresh_batch(student_ids[start:start + batch_size])
+
+
+def _refresh_batch(student_ids):
+    # Only students that still exist; a cascade delete may be in progress
+    stats = {
+        student_id: StudentStats(student_id=student_id)
+        for student_id in Student.objects.filter(id__in=student_ids).values_list('id', flat=True)
+    }
+    if not stats:
+        return
+
+    attendance = (
+        Attendance.objects.filter(student_id__in=stats)
+        .values('student_id')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(status='Present')))
+        .order_by()
+    )
+    for row in attendance:
+        row_stats = stats[row['student_id']]
+        row_stats.attendance_count = row['total']
+        row_stats.present_count = row['present']
+
+    internal = Q(exam_type__in=INTERNAL_EXAMS)
+    final = Q(exam_type__in=FINAL_EXAMS)
+    marks = (
+        Results.objects.filter(student_id__in=stats)
+        .values('student_id')
+        .annotate(
+            internal_sum=Sum('marks', filter=internal),
+            internal_count=Count('id', filter=internal),
+            final_sum=Sum('marks', filter=final),
+            final_count=Count('id', filter=final),
+        )
+        .order_by()
+    )
+    for row in marks:
+        row_stats = stats[row['student_id']]
+        row_stats.internal_marks_sum = row['internal_sum'] or 0
+        row_stats.internal_marks_count = row['internal_count']
+        row_stats.final_marks_sum = row['final_sum'] or 0
+        row_stats.final_marks_count = row['final_count']
+
+    StudentStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=STATS_FIELDS + ['updated_at'],
+    )
+    bump_version(StudentStats)
+
+
+def rebuild_all_student_stats(batch_size=500):
+    StudentStats.objects.all().delete()
+    student_ids = Student.objects.order_by('id').values_list('id', flat=True)
+    refresh_student_stats(student_ids, batch_size=batch_size)
+
+
+def get_student_stats(student):
+    try:
+        return StudentStats.objects.get(student=student)
+    except StudentStats.DoesNotExist:
+        refresh_student_stats([student.id])
+        return StudentStats.objects.get(student=student)
+
+
+def apply_delta(student_id, create_missing=True, **deltas):
+    """
+    Add ``deltas`` to a student's stats row in one UPDATE. When the row does
+    not exist yet it is built from scratch, which already includes the change.
+    """
+    if not deltas:
+        return
+    updated = StudentStats.objects.filter(student_id=student_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    bump_version(StudentStats)
+    if not updated and create_missing:
+        refresh_student_stats([student_id])
+
+
+def result_deltas(result, sign):
+    # marks may still be the raw form string on a freshly created instance
+    marks = Decimal(str(result.marks))
+    if result.exam_type in INTERNAL_EXAMS:
+        return {'internal_marks_sum': sign * marks, 'internal_marks_count': sign}
+    if result.exam_type in FINAL_EXAMS:
+        return {'final_marks_sum': sign * marks, 'final_marks_count': sign}
+    return {}
+
+
+def attendance_deltas(attendance, sign):
+    deltas = {'attendance_count': sign}
+    if attendance.status == 'Present':
+        deltas['present_count'] = sign
+    return deltas
@@ -0,0 +1,187 @@
+"""
+Reproducible synthetic institution data for benchmarks and the query-budget tests.
+
+The same seed and counts always produce the same rows. Everything is
+written with bulk_create, so no post_save handlers run; the student stats,
+the search index and the cache version stamps are rebuilt once at the end.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .cache import bump_version
+from .models import (
+    Announcement, Assignment, Attendance, Course, Enrollment, Results, Student, Submission, Teacher, User,
+)
+from .search import rebuild_index
+from .stats import rebuild_all_student_stats
+
+SYNTHETIC_PASSWORD = 'password'
+
+START_DATE = date(2025, 1, 6)
+TEACHING_DAYS = 120
+
+DEPARTMENTS = ['Computer Science', 'Mathematics', 'Physics', 'Electronics', 'Mechanical']
+CLASS_NAMES = ['FY-A', 'FY-B', 'SY-A', 'SY-B', 'TY-A', 'TY-B']
+BATCHES = ['2023', '2024', '2025']
+SUBJECTS = [
+    'Data Structures', 'Operating Systems', 'Linear Algebra', 'Thermodynamics', 'Digital Logic',
+    'Computer Networks', 'Discrete Mathematics', 'Signals and Systems', 'Databases', 'Compilers',
+]
+EXAM_TYPES = [choice for choice, _ in Results.EXAM_TYPE_CHOICES]
+
+DEFAULT_COUNTS = {
+    'students': 200,
+    'teachers': 10,
+    'courses': 20,
+    'courses_per_student': 4,
+    'assignments_per_course': 3,
+    'results': 2000,
+    'attendance': 20000,
+    'submissions': 1000,
+}
+
+
+def sample_pairs(rng, first, second, count):
+    """Pick ``count`` distinct (a, b) pairs from ``first`` x ``second`` without building the product."""
+    total = len(first) * len(second)
+    for index in sorted(rng.sample(range(total), min(count, total))):
+        yield first[index // len(second)], second[index % len(second)]
+
+
+@transaction.atomic
+def generate(seed=0, prefix='syn', batch_size=1000, **counts):
+    """
+    Create a synthetic institution and return a dict of the row counts and
+    a few representative objects (admin, teacher, student, course). Any of
+    the last three is None when no such rows were generated.
+    """
+    counts = {**DEFAULT_COUNTS, **counts}
+    if counts['courses'] and not counts['teachers']:
+        raise ValueError('Courses need at least one teacher to be assigned to.')
+    rng = random.Random(seed)
+    password = make_password(SYNTHETIC_PASSWORD)
+
+    admin = User.objects.create(
+        username=f'{prefix}_admin', email=f'{prefix}_admin@example.com', password=password, role='Admin',
+    )
+    users = User.objects.bulk_create([
+        User(
+            username=f'{prefix}_t{number:04d}', email=f'{prefix}_t{number:04d}@example.com',
+            password=password, role='Teacher', first_name='Teacher', last_name=str(number),
+        )
+        for number in range(counts['teachers'])
+    ] + [
+        User(
+            username=f'{prefix}_s{number:06d}', email=f'{prefix}_s{number:06d}@example.com',
+            password=password, role='Student', first_name='Student', last_name=str(number),
+        )
+        for number in range(counts['students'])
+    ], batch_size=batch_size)
+    teacher_users, student_users = users[:counts['teachers']], users[counts['teachers']:]
+
+    teachers = Teacher.objects.bulk_create([
+        Teacher(
+            user=user, employee_id=f'{prefix.upper()}-T{number:04d}',
+            department=DEPARTMENTS[number % len(DEPARTMENTS)], joining_date=START_DATE,
+        )
+        for number, user in enumerate(teacher_users)
+    ], batch_size=batch_size)
+    students = Student.objects.bulk_create([
+        Student(
+            user=user, roll_no=f'{prefix.upper()}{number:06d}',
+            class_name=rng.choice(CLASS_NAMES), batch=rng.choice(BATCHES),
+        )
+        for number, user in enumerate(student_users)
+    ], batch_size=batch_size)
+
+    courses = Course.objects.bulk_create([
+        Course(
+            course_code=f'{prefix.upper()}{number:04d}',
+            course_name=f'{SUBJECTS[number % len(SUBJECTS)]} {number // len(SUBJECTS) + 1}',
+            assigned_teacher=teachers[number % len(teachers)],
+            syllabus=f'Synthetic syllabus for {SUBJECTS[number % len(SUBJECTS)]}.',
+        )
+        for number in range(counts['courses'])
+    ], batch_size=batch_size)
+
+    per_student = min(counts['courses_per_student'], len(courses))
+    enrollments = Enrollment.objects.bulk_create([
+        Enrollment(student=student, course=course)
+        for student in students
+        for course in rng.sample(courses, per_student)
+    ], batch_size=batch_size)
+    pairs = [(enrollment.student, enrollment.course) for enrollment in enrollments]
+
+    Results.objects.bulk_create([
+        Results(
+            student=student, course=course, exam_type=exam_type,
+            marks=rng.randint(20, 100), date=START_DATE + timedelta(days=30 * (EXAM_TYPES.index(exam_type) + 1)),
+        )
+        for (student, course), exam_type in sample_pairs(rng, pairs, EXAM_TYPES, counts['results'])
+    ], batch_size=batch_size)
+
+    days = [START_DATE + timedelta(days=offset) for offset in range(TEACHING_DAYS)]
+    Attendance.objects.bulk_create([
+        Attendance(
+            student=student, course=course, date=day,
+            status='Present' if rng.random() < 0.85 else 'Absent',
+        )
+        for (student, course), day in sample_pairs(rng, pairs, days, counts['attendance'])
+    ], batch_size=batch_size)
+
+    assignments = Assignment.objects.bulk_create([
+        Assignment(
+            course=course, title=f'{course.course_code} Assignment {number + 1}',
+            description='Synthetic assignment.', due_date=START_DATE + timedelta(days=20 * (number + 1)),
+        )
+        for course in courses
+        for number in range(counts['assignments_per_course'])
+    ], batch_size=batch_size)
+    assignments_by_course = {}
+    for assignment in assignments:
+        assignments_by_course.setdefault(assignment.course_id, []).append(assignment)
+    candidates = [
+        (student, assignment)
+        for student, course in pairs
+        for assignment in assignments_by_course.get(course.id, [])
+    ]
+    Submission.objects.bulk_create([
+        Submission(
+            student=student, assignment=assignment, file=f'submissions/{prefix}_{student.id}_{assignment.id}.pdf',
+            status=rng.choice(['Submitted', 'Graded']),
+        )
+        for student, assignment in (candidates[index] for index in sorted(
+            rng.sample(range(len(candidates)), min(counts['submissions'], len(candidates)))
+        ))
+    ], batch_size=batch_size)
+
+    Announcement.objects.bulk_create([
+        Announcement(teacher=teacher, message=f'Welcome to the term from {teacher.user.username}.')
+        for teacher in teachers
+    ], batch_size=batch_size)
+
+    rebuild_all_student_stats(batch_size=batch_size)
+    rebuild_index()
+    bump_version(
+        User, Teacher, Student, Course, Enrollment, Results, Attendance, Announcement, Assignment, Submission,
+    )
+
+    course = courses[0] if courses else None
+    student = next((student for student, enrolled in pairs if enrolled.id == course.id), None) if course else None
+    return {
+        'counts': {
+            'users': User.objects.filter(username__startswith=f'{prefix}_').count(),
+            'courses': len(courses),
+            'enrollments': len(enrollments),
+            'results': Results.objects.filter(course__in=courses).count(),
+            'attendance': Attendance.objects.filter(course__in=courses).count(),
+            'submissions': Submission.objects.filter(assignment__in=assignments).count(),
+        },
+        'admin': admin,
+        'teacher': course.assigned_teacher if course else next(iter(teachers), None),
+        'student': student,
+        'course': course,
+    }
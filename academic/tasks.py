@@ -0,0 +1,103 @@
+"""Background tasks run by the job queue in academic.jobs."""
+from django.core.files.storage import default_storage
+
+from . import exports, imports
+from .jobs import iter_with_progress, save_result_file, set_progress, task
+from .models import Attendance, Course, Results, User
+from .search import rebuild_index
+from .stats import rebuild_all_student_stats
+
+
+@task('export_course_stats')
+def export_course_stats(job):
+    total = Course.objects.count()
+    rows = iter_with_progress(job, exports.course_stats_rows(), total, 'Courses')
+    save_result_file(job, 'course_statistics.xlsx', lambda output: exports.write_xlsx(
+        output, 'Course Statistics', exports.COURSE_STATS_HEADER, rows,
+    ))
+    return {'rows': total}
+
+
+@task('export_users', params={'role': str, 'batch': str})
+def export_users(job, role=None, batch=None):
+    users = User.objects.all()
+    if role:
+        users = users.filter(role=role)
+    if batch:
+        users = users.filter(student__batch=batch)
+    total = users.count()
+    rows = iter_with_progress(job, exports.user_rows(role=role, batch=batch), total, 'Users')
+    save_result_file(job, 'users.csv', lambda output: exports.write_csv(output, exports.USERS_HEADER, rows), text=True)
+    return {'rows': total}
+
+
+@task('export_results', roles=('Teacher',), params={'course': int})
+def export_results(job, teacher_id, course=None):
+    courses = Course.objects.filter(assigned_teacher_id=teacher_id)
+    if course:
+        courses = courses.filter(id=course)
+    total = Results.objects.filter(course__in=courses).values('student_id', 'course_id').distinct().count()
+    rows = iter_with_progress(job, exports.results_rows(courses), total, 'Students')
+    save_result_file(job, 'students_results.xlsx', lambda output: exports.write_xlsx(
+        output, 'Students', exports.RESULTS_HEADER, rows,
+    ))
+    return {'rows': total}
+
+
+@task('export_attendance', roles=('Teacher',))
+def export_attendance(job, teacher_id):
+    courses = Course.objects.filter(assigned_teacher_id=teacher_id)
+    total = Attendance.objects.filter(course__in=courses).count()
+    rows = iter_with_progress(job, exports.attendance_rows(courses), total, 'Records')
+    save_result_file(job, 'attendance_report.xlsx', lambda output: exports.write_xlsx(
+        output, 'Attendance Report', exports.ATTENDANCE_HEADER, rows,
+    ))
+    return {'rows': total}
+
+
+# Enqueued by admin_users_import with a stored copy of the upload, never from the job endpoint
+@task('import_users', roles=())
+def import_users(job, path, filename):
+    try:
+        with default_storage.open(path, 'rb') as sheet:
+            try:
+                created, errors = imports.import_users(
+                    imports.read_rows(sheet, filename),
+                    progress=lambda done, message: set_progress(job, done, message),
+                )
+            except imports.ImportFormatError as error:
+                created, errors = 0, [(1, '', str(error))]
+    finally:
+        # The sheet holds plaintext passwords; don't keep it even if the import crashed
+        default_storage.delete(path)
+    if errors:
+        save_result_file(job, 'import_errors.csv', lambda output: exports.write_csv(
+            output, imports.ERRORS_HEADER, errors,
+        ), text=True)
+    return {'created': created, 'errors': len(errors)}
+
+
+@task('rebuild_student_stats')
+def rebuild_student_stats(job):
+    set_progress(job, 0, 'Rebuilding student statistics')
+    rebuild_all_student_stats()
+    return {}
+
+
+@task('rebuild_search_index')
+def rebuild_search_index(job):
+    set_progress(job, 0, 'Rebuilding the search index')
+    return {'documents': rebuild_index()}
+
+
+@task('delete_user', roles=())
+def delete_user(job, user_id):
+    # Cascades to the profile, results, attendance and submissions
+    deleted, _ = User.objects.filter(id=user_id).exclude(role='Admin').delete()
+    return {'deleted': deleted}
+
+
+@task('delete_course', roles=())
+def delete_course(job, course_id):
+    deleted, _ = Course.objects.filter(id=course_id).delete()
+    return {'deleted': deleted}
@@ -0,0 +1,17 @@
+from django import template
+
+from ..gradebook import GRADE_COLORS, grade_for
+
+register = template.Library()
+
+
+@register.filter
+def grade(marks):
+    """Letter grade for a mark or average, using gradebook.GRADE_BANDS."""
+    return grade_for(float(marks) if marks is not None else None)
+
+
+@register.filter
+def grade_color(letter):
+    """Bootstrap colour for a letter grade's badge."""
+    return GRADE_COLORS.get(letter, 'danger')
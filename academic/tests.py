@@ -1,3 +1,1305 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import unquote
 
-# Create your tests here.
+import django
+import openpyxl
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.http import QueryDict
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics, imports, jobs, metrics, search, uploads, urls, views
+from .benchmarks import SCALES, VIEW_CASES, percentile
+from .enrollment import bulk_enroll, enrolled_students, pending_assignments
+from .exports import RESULTS_HEADER, USERS_HEADER, XLSX_CONTENT_TYPE
+from .gradebook import build_gradebook, grade_for
+from .middleware import SESSION_KEY, get_profile
+from .models import (
+    Announcement, Assignment, Attendance, Course, CourseFile, Enrollment, Job, Results, Student, StudentStats,
+    Submission, Teacher, UploadSession,
+)
+from .pagination import encode_cursor, keyset_paginate
+from .reports import course_stats_queryset
+from .roster import filter_roster
+from .synthetic import generate
+
+# Each request is repeated this many times per scale for the timing percentiles
+PERF_REPEAT = int(os.environ.get('PERF_REPEAT', 5))
+# Where to write the timing report, if anywhere
+PERF_RESULTS = os.environ.get('PERF_RESULTS')
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='academic-tests-')
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def client_for(profile):
+    """A client logged in as ``profile``'s user, with the profile already remembered in the session."""
+    client = Client()
+    client.force_login(profile.user)
+    session = client.session
+    session[SESSION_KEY] = [profile.user.pk, profile.user.role, profile.pk]
+    session.save()
+    return client
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    MEDIA_ACCEL=None,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class QueryBudgetTests(TestCase):
+    """
+    Requests every URL at each of benchmarks.SCALES and checks its query
+    count against the case's budget and against the other scales. Wall
+    times are written to PERF_RESULTS, when set, so runs can be compared
+    across commits.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_every_url_has_a_case(self):
+        url_names = {pattern.name for pattern in urls.urlpatterns}
+        case_names = [case.name for case in VIEW_CASES]
+        self.assertEqual(len(case_names), len(set(case_names)), 'URL names with more than one case')
+        self.assertEqual(url_names - set(case_names), set(), 'URLs without a case in benchmarks.VIEW_CASES')
+
+    def measure(self, case, data):
+        """Return the status codes, the largest query log and the wall times of PERF_REPEAT requests."""
+        profiles = {'teacher': data['teacher'], 'student': data['student']}
+        users = {'admin': data['admin'], 'teacher': data['teacher'].user, 'student': data['student'].user}
+        statuses, timings, worst = set(), [], []
+        for _ in range(PERF_REPEAT):
+            client = Client()
+            if case.role:
+                user = users[case.role]
+                client.force_login(user)
+                if case.role in profiles:
+                    # A returning user, whose profile id is already remembered in the session
+                    session = client.session
+                    session[SESSION_KEY] = [user.pk, user.role, profiles[case.role].pk]
+                    session.save()
+            # Every request starts cold so cached views are charged their full cost
+            url, body = case.prepare(data)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = case.send(client, url, body)
+                timings.append((time.perf_counter() - start) * 1000)
+            statuses.add(response.status_code)
+            if len(queries) > len(worst):
+                worst = [query['sql'] for query in queries.captured_queries]
+        return statuses, worst, timings
+
+    def test_query_budgets(self):
+        report = {
+            'commit': git_commit(),
+            'recorded_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': PERF_REPEAT,
+            'scales': {},
+            'views': {case.name: {} for case in VIEW_CASES},
+        }
+        for scale, counts in SCALES.items():
+            with transaction.atomic():
+                data = generate(seed=0, **counts)
+                report['scales'][scale] = data['counts']
+                for case in VIEW_CASES:
+                    statuses, queries, timings = self.measure(case, data)
+                    report['views'][case.name][scale] = {
+                        'queries': len(queries),
+                        'p50_ms': round(percentile(timings, 50), 2),
+                        'p90_ms': round(percentile(timings, 90), 2),
+                        'p99_ms': round(percentile(timings, 99), 2),
+                        'max_ms': round(max(timings), 2),
+                    }
+                    with self.subTest(view=case.name, scale=scale):
+                        self.assertEqual(statuses, {case.status})
+                        self.assertLessEqual(
+                            len(queries), case.budget,
+                            f'{case.name} is over its query budget:\n' + '\n'.join(queries),
+                        )
+                transaction.set_rollback(True)
+
+        # A count that grows with the data means a query per row somewhere
+        for name, results in report['views'].items():
+            counts = {scale: result['queries'] for scale, result in results.items()}
+            with self.subTest(view=name):
+                self.assertEqual(len(set(counts.values())), 1, f'{name} query count depends on data size: {counts}')
+
+        if PERF_RESULTS:
+            with open(PERF_RESULTS, 'w') as output:
+                json.dump(report, output, indent=2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DashboardPanelTests(TestCase):
+    """The dashboard panels are cached per user until their data changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_visit_runs_only_session_queries(self):
+        for name, profile in [('student_dashboard', self.data['student']), ('teacher_dashboard', self.data['teacher'])]:
+            client = client_for(profile)
+            client.get(reverse(name))
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(reverse(name))
+            with self.subTest(view=name):
+                self.assertEqual(response.status_code, 200)
+                # The session and the user it points to
+                self.assertEqual(len(queries), 2, '\n'.join(query['sql'] for query in queries.captured_queries))
+
+    def test_writes_refresh_the_panels(self):
+        student, teacher = self.data['student'], self.data['teacher']
+        client = client_for(student)
+        count = Results.objects.filter(student=student).count()
+        client.get(reverse('student_dashboard'))
+        Results.objects.filter(student=student).first().delete()
+        response = client.get(reverse('student_dashboard'))
+        self.assertContains(response, f'<h3 class="text-primary">{count - 1}</h3>', html=True)
+
+        client = client_for(teacher)
+        client.get(reverse('teacher_dashboard'))
+        Announcement.objects.create(teacher=teacher, message='Quiz moved to Friday.')
+        self.assertContains(client.get(reverse('teacher_dashboard')), 'Quiz moved to Friday.')
+
+    def test_panels_are_per_user(self):
+        other = Results.objects.exclude(student=self.data['student']).select_related('student__user').first().student
+        client_for(self.data['student']).get(reverse('student_dashboard'))
+        response = client_for(other).get(reverse('student_dashboard'))
+        count = Results.objects.filter(student=other).count()
+        self.assertContains(response, f'<h3 class="text-primary">{count}</h3>', html=True)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TimeSeriesTests(TestCase):
+    """The chart endpoints answer repeat requests from their ETag until the data changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.data['student'].user)
+
+    def test_marks_series(self):
+        response = self.client.get(reverse('student_marks_series'))
+        payload = response.json()
+        self.assertEqual(set(payload['series']), {'CA-I', 'MSE', 'CA-II'})
+        for values in payload['series'].values():
+            self.assertEqual(len(values), len(payload['dates']))
+        self.assertNotIn(b' ', response.content)
+
+    def test_attendance_series(self):
+        payload = self.client.get(reverse('student_attendance_series')).json()
+        records = Attendance.objects.filter(student=self.data['student']).count()
+        self.assertEqual(sum(payload['total']), records)
+        self.assertTrue(all(0 <= rate <= 100 for rate in payload['rate']))
+
+    def test_etag_until_write(self):
+        url = reverse('student_marks_series')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('academic_results' in query['sql'] for query in queries.captured_queries))
+
+        result = Results.objects.filter(student=self.data['student']).first()
+        result.marks = 12
+        result.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_course_series_is_limited_to_own_courses(self):
+        other = Course.objects.exclude(assigned_teacher=self.data['teacher']).first()
+        self.client.force_login(self.data['teacher'].user)
+        self.assertEqual(self.client.get(reverse('course_marks_series', args=[self.data['course'].id])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('course_attendance_series', args=[other.id])).status_code, 404)
+
+
+class ClassStatisticsTests(TestCase):
+    def test_describe(self):
+        values = [35.0, 60.0, 60.0, 72.5, 88.0, 95.0]
+        stats = analytics.describe([1, 2, 3, 4, 5, 6], values)
+        self.assertEqual(stats['count'], 6)
+        self.assertAlmostEqual(stats['mean'], sum(values) / 6)
+        self.assertEqual(stats['median'], 66.25)
+        self.assertEqual(stats['min'], 35.0)
+        self.assertEqual(sum(bucket['count'] for bucket in stats['histogram']), 6)
+        self.assertEqual(stats['histogram'][-1], {'label': '90-100', 'count': 1})
+        # Tied students share a rank
+        self.assertEqual(stats['ranks'], {1: 8.3, 2: 33.3, 3: 33.3, 4: 58.3, 5: 75.0, 6: 91.7})
+
+    def test_grade_bands_match_grade_for(self):
+        values = [float(mark) for mark in range(0, 101)]
+        counts = {band['grade']: band['count'] for band in analytics.grade_counts(values)}
+        expected = {}
+        for value in values:
+            expected[grade_for(value)] = expected.get(grade_for(value), 0) + 1
+        self.assertEqual(counts, expected)
+
+    def test_empty_class(self):
+        stats = analytics.describe([], [])
+        self.assertIsNone(stats['mean'])
+        self.assertEqual(stats['ranks'], {})
+
+    def test_course_stats_use_one_query(self):
+        data = generate(seed=0, **SCALES['small'])
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            stats = analytics.course_stats(data['course'])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(stats['count'], Results.objects.filter(course=data['course']).values('student').distinct().count())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RollCallTests(TestCase):
+    """A class's roll call is saved in one request and resubmitting it changes nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+        cls.course = cls.data['course']
+        cls.students = list(Student.objects.filter(enrollments__course=cls.course).order_by('id')[:3])
+
+    def setUp(self):
+        self.client = client_for(self.data['teacher'])
+
+    def post(self, entries, day='2025-09-01'):
+        return self.client.post(
+            reverse('teacher_attendance_save'),
+            json.dumps({'course': self.course.id, 'date': day, 'entries': entries}),
+            content_type='application/json',
+        )
+
+    def test_resubmitting_is_idempotent(self):
+        entries = [{'student_id': student.id, 'status': 'Present'} for student in self.students]
+        self.assertEqual(self.post(entries).json(), {
+            'course': self.course.id, 'date': '2025-09-01', 'created': 3, 'updated': 0, 'unchanged': 0,
+        })
+        self.assertEqual(self.post(entries).json()['unchanged'], 3)
+
+        entries[0]['status'] = 'Absent'
+        self.assertEqual(self.post(entries).json()['updated'], 1)
+        self.assertEqual(
+            Attendance.objects.filter(course=self.course, date='2025-09-01').count(), 3,
+        )
+        self.assertEqual(
+            Attendance.objects.get(course=self.course, date='2025-09-01', student=self.students[0]).status, 'Absent',
+        )
+
+    def test_rejects_invalid_statuses(self):
+        for status in ['Late', [], {'a': 1}, None, 1]:
+            with self.subTest(status=status):
+                response = self.post([{'student_id': self.students[0].id, 'status': status}])
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.filter(course=self.course, date='2025-09-01').exists())
+
+    def test_rejects_students_not_enrolled(self):
+        outsider = Student.objects.exclude(enrollments__course=self.course).first()
+        response = self.post([{'student_id': outsider.id, 'status': 'Present'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['student_ids'], [outsider.id])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkMarksTests(TestCase):
+    """The results grid saves many rows at once and reports bad rows by index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+        cls.course = cls.data['course']
+        cls.students = list(Student.objects.filter(enrollments__course=cls.course).order_by('id')[:2])
+
+    def setUp(self):
+        self.client = client_for(self.data['teacher'])
+
+    def post(self, rows):
+        return self.client.post(reverse('teacher_results_save'), json.dumps({'rows': rows}), content_type='application/json')
+
+    def row(self, student, **fields):
+        return {'student_id': student.id, 'course_id': self.course.id, 'exam_type': 'MSE', 'marks': '55', **fields}
+
+    def test_upserts_valid_rows(self):
+        first, second = self.students
+        payload = self.post([
+            self.row(first, marks='40'),
+            self.row(second, marks='72.5', date='2025-09-01'),
+            # A later row for the same exam wins
+            self.row(first, marks='41'),
+        ]).json()
+        self.assertEqual(payload, {'saved': 2, 'errors': []})
+        self.assertEqual(Results.objects.get(student=first, course=self.course, exam_type='MSE').marks, 41)
+
+        self.post([self.row(first, marks='90')])
+        self.assertEqual(Results.objects.filter(student=first, course=self.course, exam_type='MSE').count(), 1)
+        self.assertEqual(Results.objects.get(student=first, course=self.course, exam_type='MSE').marks, 90)
+
+    def test_reports_invalid_rows(self):
+        first = self.students[0]
+        other = Course.objects.exclude(assigned_teacher=self.data['teacher']).first()
+        outsider = Student.objects.exclude(enrollments__course=self.course).first()
+        payload = self.post([
+            self.row(first, marks='60'),
+            'not a row',
+            self.row(first, course_id=other.id),
+            self.row(outsider),
+            self.row(first, exam_type='Final'),
+            self.row(first, exam_type=['MSE']),
+            self.row(first, exam_type={'MSE': 1}),
+            self.row(first, marks='101'),
+            self.row(first, marks=['55']),
+            self.row(first, marks={'value': 55}),
+            self.row(first, marks='NaN'),
+            self.row(first, date='01/09/2025'),
+        ]).json()
+        self.assertEqual(payload['saved'], 1)
+        errors = {error['index']: set(error['errors']) for error in payload['errors']}
+        self.assertEqual(errors, {
+            1: {'row'},
+            2: {'course_id'},
+            3: {'student_id'},
+            4: {'exam_type'}, 5: {'exam_type'}, 6: {'exam_type'},
+            7: {'marks'}, 8: {'marks'}, 9: {'marks'}, 10: {'marks'},
+            11: {'date'},
+        })
+
+    def test_rejects_malformed_payloads(self):
+        for body in ['not json', json.dumps({}), json.dumps({'rows': {'student_id': 1}})]:
+            with self.subTest(body=body):
+                response = self.client.post(reverse('teacher_results_save'), body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+class GradebookTests(TestCase):
+    """The gradebook pivots every student's marks in two queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def test_rows_match_results(self):
+        course = self.data['course']
+        students = Student.objects.filter(enrollments__course=course)
+        with CaptureQueriesContext(connection) as queries:
+            rows = build_gradebook([course], students)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(len(rows), students.count())
+        for row in rows:
+            marks = list(Results.objects.filter(student_id=row['id'], course=course).values_list('marks', flat=True))
+            with self.subTest(student=row['roll_no']):
+                self.assertEqual(len(row['results']), len(marks))
+                if marks:
+                    self.assertAlmostEqual(row['average'], float(sum(marks)) / len(marks))
+                else:
+                    self.assertIsNone(row['average'])
+                self.assertEqual(row['grade'], grade_for(row['average']))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ExportTests(TestCase):
+    """Exports are streamed from the server with one row per record."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def test_results_workbook(self):
+        teacher = self.data['teacher']
+        response = client_for(teacher).get(reverse('teacher_results_export'))
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        sheet = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]), RESULTS_HEADER)
+        pairs = Results.objects.filter(course__assigned_teacher=teacher).values('student', 'course').distinct()
+        self.assertEqual(len(rows) - 1, pairs.count())
+
+    def test_malformed_course_is_ignored(self):
+        client = client_for(self.data['teacher'])
+        for course in ['\u00b2', 'abc', '9' * 30]:
+            with self.subTest(course=course):
+                self.assertEqual(client.get(reverse('teacher_results'), {'course': course}).status_code, 200)
+                self.assertEqual(client.get(reverse('teacher_results_export'), {'course': course}).status_code, 200)
+
+    def test_attendance_workbook(self):
+        teacher = self.data['teacher']
+        response = client_for(teacher).get(reverse('teacher_attendance_export'))
+        sheet = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        self.assertEqual(
+            sum(1 for _ in sheet.values) - 1, Attendance.objects.filter(course__assigned_teacher=teacher).count(),
+        )
+
+    def test_users_csv(self):
+        self.client.force_login(self.data['admin'])
+        response = self.client.get(reverse('admin_users_export'), {'role': 'Student'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], USERS_HEADER)
+        self.assertEqual(len(rows) - 1, Student.objects.count())
+        self.assertEqual({row[4] for row in rows[1:]}, {'Student'})
+
+
+class ConstraintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def test_one_attendance_row_per_day(self):
+        record = Attendance.objects.filter(course=self.data['course']).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(student=record.student, course=record.course, date=record.date, status='Absent')
+
+    def test_one_result_per_exam(self):
+        result = Results.objects.filter(course=self.data['course']).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Results.objects.create(student=result.student, course=result.course, exam_type=result.exam_type, marks=50)
+
+
+class StudentStatsTests(TestCase):
+    """StudentStats always equals totals computed from the raw rows, whichever way they were written."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+        # A course with no marks or attendance yet, so any exam type can be added
+        cls.course = Course.objects.create(
+            course_code='STATS1', course_name='Statistics', assigned_teacher=cls.data['teacher'],
+        )
+        Enrollment.objects.create(student=cls.data['student'], course=cls.course)
+
+    def assertStatsCurrent(self, student):
+        stats = StudentStats.objects.get(student=student)
+        attendance = Attendance.objects.filter(student=student)
+        results = Results.objects.filter(student=student)
+        internal = results.filter(exam_type__in=['CA-I', 'CA-II'])
+        final = results.filter(exam_type='MSE')
+        self.assertEqual(
+            [stats.present_count, stats.attendance_count, stats.internal_marks_count, stats.final_marks_count],
+            [attendance.filter(status='Present').count(), attendance.count(), internal.count(), final.count()],
+        )
+        self.assertEqual(stats.internal_marks_sum, sum(internal.values_list('marks', flat=True), Decimal(0)))
+        self.assertEqual(stats.final_marks_sum, sum(final.values_list('marks', flat=True), Decimal(0)))
+
+    def test_single_row_writes(self):
+        student = self.data['student']
+        result = Results.objects.create(student=student, course=self.course, exam_type='CA-II', marks=Decimal('47.5'))
+        result.refresh_from_db()
+        self.assertStatsCurrent(student)
+        result.exam_type = 'MSE'
+        result.marks = Decimal('81')
+        result.save()
+        self.assertStatsCurrent(student)
+        result.delete()
+        self.assertStatsCurrent(student)
+
+        record = Attendance.objects.create(student=student, course=self.course, date='2025-09-01', status='Present')
+        self.assertStatsCurrent(student)
+        record.status = 'Absent'
+        record.save()
+        self.assertStatsCurrent(student)
+        record.delete()
+        self.assertStatsCurrent(student)
+
+    def test_missing_row_is_rebuilt(self):
+        student = self.data['student']
+        StudentStats.objects.filter(student=student).delete()
+        Attendance.objects.create(student=student, course=self.course, date='2025-09-01', status='Present')
+        self.assertStatsCurrent(student)
+
+    def test_bulk_writes(self):
+        student = self.data['student']
+        client = client_for(self.data['teacher'])
+        client.post(reverse('teacher_results_save'), json.dumps({'rows': [
+            {'student_id': student.id, 'course_id': self.course.id, 'exam_type': exam_type, 'marks': '66'}
+            for exam_type in ['CA-I', 'MSE', 'CA-II']
+        ]}), content_type='application/json')
+        self.assertStatsCurrent(student)
+        client.post(reverse('teacher_attendance_save'), json.dumps({
+            'course': self.course.id, 'date': '2025-09-01', 'entries': [{'student_id': student.id, 'status': 'Absent'}],
+        }), content_type='application/json')
+        self.assertStatsCurrent(student)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CourseStatisticsTests(TestCase):
+    """The admin course statistics are computed per course in one query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def test_counts(self):
+        with CaptureQueriesContext(connection) as queries:
+            courses = list(course_stats_queryset())
+        self.assertEqual(len(queries), 1)
+        for course in courses:
+            with self.subTest(course=course.course_code):
+                self.assertEqual(course.students, Enrollment.objects.filter(course=course).count())
+                self.assertEqual(course.assignments, Assignment.objects.filter(course=course).count())
+                self.assertEqual(course.submissions, Submission.objects.filter(assignment__course=course).count())
+
+    def test_students_are_enrollments(self):
+        course = Course.objects.create(course_code='NEW1', course_name='New Course', assigned_teacher=self.data['teacher'])
+        student = self.data['student']
+        Enrollment.objects.create(student=student, course=course)
+        # Attendance alone does not make a student enrolled
+        Attendance.objects.create(
+            student=Student.objects.exclude(id=student.id).first(), course=course, date='2025-09-01', status='Present',
+        )
+        self.assertEqual(course_stats_queryset().get(id=course.id).students, 1)
+
+    def test_json_pages_and_sorts(self):
+        self.client.force_login(self.data['admin'])
+        url = reverse('admin_reports_courses_json')
+        payload = self.client.get(url, {'per_page': 3, 'sort': '-submissions'}).json()
+        self.assertEqual(payload['count'], Course.objects.count())
+        self.assertEqual(len(payload['results']), 3)
+        submissions = [course['submissions'] for course in payload['results']]
+        self.assertEqual(submissions, sorted(submissions, reverse=True))
+        # Unknown sorts fall back to the course code
+        codes = [course['course_code'] for course in self.client.get(url, {'sort': 'password'}).json()['results']]
+        self.assertEqual(codes, sorted(codes))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminCounterTests(TestCase):
+    """The admin dashboard counters are cached until a counted table is written to."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.data['admin'])
+
+    def test_counters_are_cached_until_written(self):
+        url = reverse('admin_dashboard')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(response.context['total_courses'], Course.objects.count())
+
+        Course.objects.create(course_code='NEW1', course_name='New Course', assigned_teacher=self.data['teacher'])
+        response = self.client.get(url)
+        self.assertEqual(response.context['total_courses'], Course.objects.count())
+        self.assertEqual(response.context['total_students'], Student.objects.count())
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursors walk a table in both directions and bad input falls back to the first page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+        cls.records = Attendance.objects.filter(course=cls.data['course'])
+        cls.ordered = list(cls.records.order_by('-date', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [record.id for record in page]
+
+    def test_walk_forwards_and_back(self):
+        pages = [keyset_paginate(self.records, 'date', page_size=7)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(self.records, 'date', after=pages[-1].next_cursor, page_size=7))
+        self.assertEqual([record_id for page in pages for record_id in self.ids(page)], self.ordered)
+        self.assertFalse(pages[0].has_previous)
+
+        page, previous = pages[-1], []
+        while page.has_previous:
+            page = keyset_paginate(self.records, 'date', before=page.previous_cursor, page_size=7)
+            previous.insert(0, self.ids(page))
+        self.assertEqual(previous, [self.ids(page) for page in pages[:-1]])
+
+    def test_bad_input_falls_back_to_the_first_page(self):
+        first = self.ids(keyset_paginate(self.records, 'date', page_size=5))
+        cursors = [
+            'garbage', '!!!\u00e9', encode_cursor(date(2025, 1, 1), 10 ** 30),
+            base64.urlsafe_b64encode(b'[null, 1]').decode(),
+            base64.urlsafe_b64encode(b'["2025-01-01", 1e400]').decode(),
+            base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.ids(keyset_paginate(self.records, 'date', after=cursor, page_size=5)), first)
+                self.assertEqual(self.ids(keyset_paginate(self.records, 'date', before=cursor, page_size=5)), first)
+
+    def test_links_keep_other_parameters(self):
+        client = client_for(self.data['teacher'])
+        course = self.data['course']
+        response = client.get(reverse('teacher_attendance'), {'course': course.id, 'page_size': 'x', 'q': 'Student'})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['attendance']
+        self.assertEqual(page.page_size, 25)
+        response = client.get(reverse('teacher_attendance'), {
+            'course': course.id, 'q': 'Student', 'page_size': 5, 'after': page.next_cursor,
+        })
+        links = re.findall(r'href="(\?[^"]*page_size=[^"]*)"', response.content.decode())
+        # First, Previous and Next
+        self.assertEqual(len(links), 3)
+        for link in links:
+            params = QueryDict(html.unescape(link)[1:])
+            self.assertEqual(params['course'], str(course.id))
+            self.assertEqual(params['q'], 'Student')
+            self.assertEqual(params['page_size'], '5')
+            self.assertFalse('after' in params and 'before' in params)
+
+
+class EnrollmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def test_enrolled_students_and_pending_assignments(self):
+        course, student = self.data['course'], self.data['student']
+        self.assertEqual(
+            set(enrolled_students([course]).values_list('id', flat=True)),
+            set(Enrollment.objects.filter(course=course).values_list('student_id', flat=True)),
+        )
+        pending = set(pending_assignments(student).values_list('id', flat=True))
+        submitted = set(Submission.objects.filter(student=student).values_list('assignment_id', flat=True))
+        courses = Enrollment.objects.filter(student=student).values('course_id')
+        assignments = set(Assignment.objects.filter(course_id__in=courses).values_list('id', flat=True))
+        self.assertEqual(pending, assignments - submitted)
+
+    def test_bulk_enroll_skips_existing(self):
+        course = self.data['course']
+        before = Enrollment.objects.filter(course=course).count()
+        added = bulk_enroll(course, Student.objects.all(), batch_size=7)
+        self.assertEqual(added, Student.objects.count() - before)
+        self.assertEqual(bulk_enroll(course, Student.objects.all()), 0)
+
+
+class RoleProfileTests(TestCase):
+    """The role profile is looked up once and then rebuilt from the session."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def request_for(self, user, session):
+        request = RequestFactory().get('/')
+        request.user = user
+        request.session = session
+        return request
+
+    def test_profile_is_remembered_in_the_session(self):
+        teacher = self.data['teacher']
+        session = {}
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_profile(self.request_for(teacher.user, session)).pk, teacher.pk)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(session[SESSION_KEY], [teacher.user.pk, 'Teacher', teacher.pk])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(get_profile(self.request_for(teacher.user, session)).pk, teacher.pk)
+        self.assertEqual(len(queries), 0)
+
+    def test_session_of_another_user_is_ignored(self):
+        teacher, student = self.data['teacher'], self.data['student']
+        session = {SESSION_KEY: [teacher.user.pk, 'Teacher', teacher.pk]}
+        profile = get_profile(self.request_for(student.user, session))
+        self.assertIsInstance(profile, Student)
+        self.assertEqual(profile.pk, student.pk)
+
+    def test_admin_has_no_profile(self):
+        self.assertIsNone(get_profile(self.request_for(self.data['admin'], {})))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SearchTests(TestCase):
+    """Search finds only what the user's role can see, through FTS5 or the LIKE fallback alike."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+        cls.teacher = cls.data['teacher']
+        cls.other_teacher = Teacher.objects.exclude(id=cls.teacher.id).first()
+        cls.own = Course.objects.create(
+            course_code='QT101', course_name='Quaternions', assigned_teacher=cls.teacher,
+            syllabus='Quaternion rotations and interpolation.',
+        )
+        cls.others = Course.objects.create(
+            course_code='QT201', course_name='Algebra', assigned_teacher=cls.other_teacher,
+            syllabus='Quaternion algebra.',
+        )
+        cls.own_announcement = Announcement.objects.create(teacher=cls.teacher, message='Quaternion quiz on Monday.')
+        cls.other_announcement = Announcement.objects.create(
+            teacher=cls.other_teacher, message='Quaternion homework is due.',
+        )
+        cls.student = Student.objects.exclude(enrollments__course__assigned_teacher=cls.other_teacher).first()
+        Enrollment.objects.create(student=cls.student, course=cls.own)
+
+    def hits(self, user, query='quaternion'):
+        client = Client()
+        client.force_login(user)
+        results = client.get(reverse('search'), {'q': query}).json()['results']
+        return {(hit['kind'], hit['id']) for hit in results}
+
+    def test_scoped_by_role(self):
+        own = {('course', self.own.id), ('announcement', self.own_announcement.id)}
+        others = {('course', self.others.id), ('announcement', self.other_announcement.id)}
+        self.assertEqual(self.hits(self.data['admin']), own | others)
+        self.assertEqual(self.hits(self.teacher.user), own)
+        self.assertEqual(self.hits(self.other_teacher.user), others)
+        self.assertEqual(self.hits(self.student.user), own)
+        outsider = Student.objects.exclude(enrollments__course__assigned_teacher=self.teacher).first()
+        self.assertEqual(self.hits(outsider.user) & own, set())
+
+    def test_like_fallback_finds_the_same(self):
+        self.assertTrue(search.fts_available())
+        users = [self.data['admin'], self.teacher.user, self.student.user]
+        queries = ['quaternion', 'Quaternion rot', 'QT101', 'nothing matches this']
+        expected = {(user.pk, query): self.hits(user, query) for user in users for query in queries}
+        with mock.patch('academic.search.fts_available', return_value=False):
+            for user in users:
+                for query in queries:
+                    with self.subTest(user=user.username, query=query):
+                        self.assertEqual(self.hits(user, query), expected[user.pk, query])
+
+    def test_page_is_clamped(self):
+        client = Client()
+        client.force_login(self.teacher.user)
+        for page, expected in [('1' + '0' * 20, views.MAX_SEARCH_PAGE), ('abc', 1), ('-3', 1)]:
+            with self.subTest(page=page):
+                response = client.get(reverse('search'), {'q': 'quaternion', 'page': page})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['page'], expected)
+
+    def test_title_matches_rank_first(self):
+        hits, _ = search.search('quaternions')
+        self.assertEqual((hits[0]['kind'], hits[0]['id']), ('course', self.own.id))
+
+    def test_index_follows_writes(self):
+        self.own.syllabus = 'Octonions.'
+        self.own.save()
+        self.assertEqual(self.hits(self.teacher.user, 'octonions'), {('course', self.own.id)})
+        self.own_announcement.delete()
+        self.assertEqual(self.hits(self.teacher.user, 'quiz'), set())
+
+    def test_availability_is_cached_until_migrate(self):
+        search.reset_fts_available()
+        self.assertTrue(search.fts_available())
+        name = connection.settings_dict['NAME']
+        search._fts_databases[name] = False
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(search.fts_available())
+        self.assertEqual(len(queries), 0)
+        search.reset_fts_available()
+        self.assertTrue(search.fts_available())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterTests(TestCase):
+    """The teacher grids search and page the course roster on the server."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+        cls.course = cls.data['course']
+        cls.enrolled = enrolled_students([cls.course])
+
+    def roster(self, **params):
+        client = client_for(self.data['teacher'])
+        return client.get(reverse('teacher_roster'), {'grid': 'attendance', 'course': self.course.id, **params})
+
+    def test_filters(self):
+        student = self.enrolled.select_related('user').order_by('roll_no').first()
+        cases = [
+            ({'q': student.roll_no.lower()}, self.enrolled.filter(roll_no=student.roll_no)),
+            ({'q': student.user.username}, self.enrolled.filter(user__username=student.user.username)),
+            ({'class_name': student.class_name}, self.enrolled.filter(class_name=student.class_name)),
+            ({'q': 'Student', 'class_name': 'none'}, self.enrolled.none()),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.roster(**params).json()['count'], expected.count())
+
+    def test_prefix_range_is_a_prefix_match(self):
+        roll_no = self.enrolled.order_by('roll_no').first().roll_no
+        matched = filter_roster(self.enrolled, roll_no[:-1])
+        self.assertEqual(
+            set(matched.values_list('id', flat=True)),
+            set(self.enrolled.filter(roll_no__startswith=roll_no[:-1]).values_list('id', flat=True)),
+        )
+
+    def test_pages(self):
+        payload = self.roster(page=1).json()
+        self.assertEqual(payload['count'], self.enrolled.count())
+        self.assertEqual(payload['page'], 1)
+        self.assertEqual(self.roster(grid='other').status_code, 400)
+
+
+def use_temporary_media(test):
+    """Point MEDIA_ROOT at a fresh directory for the rest of ``test``."""
+    media_root = tempfile.mkdtemp(prefix='academic-tests-')
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    override = override_settings(MEDIA_ROOT=media_root, MEDIA_ACCEL=None)
+    override.enable()
+    test.addCleanup(override.disable)
+    return media_root
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ChunkedUploadTests(TestCase):
+    """Uploads are appended at the acknowledged offset and stored once per content hash."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        self.media_root = use_temporary_media(self)
+        self.client = client_for(self.data['teacher'])
+
+    def start(self, size, filename='notes.pdf'):
+        response = self.client.post(reverse('upload_start'), json.dumps({
+            'kind': 'course_file', 'target': self.data['course'].id, 'filename': filename, 'size': size,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def chunk(self, upload_id, offset, data):
+        return self.client.post(
+            f"{reverse('upload_chunk', args=[upload_id])}?offset={offset}", data,
+            content_type='application/octet-stream',
+        )
+
+    def finalize(self, upload_id):
+        return self.client.post(reverse('upload_finalize', args=[upload_id]))
+
+    def upload(self, content, filename='notes.pdf', chunk_size=4):
+        upload_id = self.start(len(content), filename)
+        for offset in range(0, len(content), chunk_size):
+            self.assertEqual(self.chunk(upload_id, offset, content[offset:offset + chunk_size]).status_code, 200)
+        return self.finalize(upload_id)
+
+    def test_upload_in_chunks(self):
+        content = b'chunked upload content'
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual(payload['sha256'], hashlib.sha256(content).hexdigest())
+        self.assertFalse(payload['deduplicated'])
+        course_file = CourseFile.objects.get(id=payload['id'])
+        self.assertEqual(course_file.original_name, 'notes.pdf')
+        with course_file.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_wrong_offset_is_a_conflict(self):
+        upload_id = self.start(8)
+        self.assertEqual(self.chunk(upload_id, 0, b'1234').status_code, 200)
+        # A retried chunk the server already has
+        response = self.chunk(upload_id, 0, b'1234')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4)
+        self.assertEqual(self.chunk(upload_id, 6, b'78').status_code, 409)
+        self.assertEqual(self.client.get(reverse('upload_status', args=[upload_id])).json()['offset'], 4)
+        # Finalizing before the last chunk
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+
+    def test_upload_is_finalized_once(self):
+        upload_id = self.start(4)
+        self.assertEqual(self.chunk(upload_id, 0, b'1234').status_code, 200)
+        # Another request has claimed the upload and is still storing it
+        UploadSession.objects.filter(pk=upload_id).update(finalizing=True)
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+        self.assertEqual(self.client.delete(reverse('upload_status', args=[upload_id])).status_code, 409)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, uploads.PARTIAL_DIR, f'{upload_id}.part')))
+        self.assertFalse(CourseFile.objects.filter(original_name='notes.pdf').exists())
+
+    def test_chunk_past_the_declared_size(self):
+        upload_id = self.start(6)
+        self.assertEqual(self.chunk(upload_id, 0, b'1234').status_code, 200)
+        self.assertEqual(self.chunk(upload_id, 4, b'5678').status_code, 400)
+        self.assertEqual(self.chunk(upload_id, 4, b'56').status_code, 200)
+
+    def test_identical_content_is_stored_once(self):
+        content = b'the same bytes twice'
+        first = self.upload(content, 'first.pdf').json()
+        second = self.upload(content, 'second.pdf').json()
+        self.assertTrue(second['deduplicated'])
+        first_file, second_file = CourseFile.objects.get(id=first['id']), CourseFile.objects.get(id=second['id'])
+        self.assertEqual(first_file.file.name, second_file.file.name)
+        self.assertEqual(second_file.original_name, 'second.pdf')
+        self.assertEqual(os.listdir(os.path.join(self.media_root, uploads.PARTIAL_DIR)), [])
+
+    def test_only_own_targets(self):
+        other = Course.objects.exclude(assigned_teacher=self.data['teacher']).first()
+        response = self.client.post(reverse('upload_start'), json.dumps({
+            'kind': 'course_file', 'target': other.id, 'filename': 'x.pdf', 'size': 1,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MediaServingTests(TestCase):
+    """Downloads honour Range, ETag and If-Range, and only reach users of the course."""
+
+    content = b'0123456789abcdefghij'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        use_temporary_media(self)
+        self.course_file = CourseFile.objects.create(course=self.data['course'])
+        self.course_file.file.save('notes.txt', ContentFile(self.content))
+        self.url = reverse('course_file_download', args=[self.course_file.id])
+        self.client = client_for(self.data['teacher'])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_ranges(self):
+        cases = [
+            ('bytes=2-5', b'2345', 'bytes 2-5/20'),
+            ('bytes=15-', b'fghij', 'bytes 15-19/20'),
+            ('bytes=-3', b'hij', 'bytes 17-19/20'),
+            ('bytes=18-100', b'ij', 'bytes 18-19/20'),
+        ]
+        for header, expected, content_range in cases:
+            with self.subTest(range=header):
+                response, body = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(body, expected)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(expected)))
+
+    def test_unsatisfiable_and_ignored_ranges(self):
+        for header in ['bytes=20-', 'bytes=5-2', 'bytes=-0']:
+            with self.subTest(range=header):
+                response, _ = self.get(Range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */20')
+        # Malformed and multi-range headers are ignored
+        for header in ['bytes=a-b', 'bytes=0-1,4-5', 'lines=1-2']:
+            with self.subTest(range=header):
+                response, body = self.get(Range=header)
+                self.assertEqual((response.status_code, body), (200, self.content))
+
+    def test_etag_and_if_range(self):
+        response, _ = self.get()
+        etag = response['ETag']
+        self.assertEqual(self.get(If_None_Match=etag)[0].status_code, 304)
+        self.assertEqual(self.get(Range='bytes=0-3', If_Range=etag)[0].status_code, 206)
+        # A range of a copy that has since changed would be corrupt, so the whole file is sent
+        response, body = self.get(Range='bytes=0-3', If_Range='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.content))
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected/')
+    def test_accel_redirect(self):
+        response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.course_file.file.name}')
+        self.assertEqual(body, b'')
+
+    def test_accel_headers_are_quoted(self):
+        self.course_file.file.save('r\u00e9sum\u00e9.txt', ContentFile(self.content))
+        name = self.course_file.file.name
+        with override_settings(MEDIA_ACCEL='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected/'):
+            header = self.get()[0]['X-Accel-Redirect']
+        self.assertTrue(header.isascii())
+        self.assertEqual(unquote(header), f'/protected/{name}')
+        with override_settings(MEDIA_ACCEL='x-sendfile'):
+            header = self.get()[0]['X-Sendfile']
+        self.assertTrue(header.isascii())
+        self.assertEqual(unquote(header), self.course_file.file.path)
+
+    def test_only_users_of_the_course(self):
+        other = Teacher.objects.exclude(id=self.data['teacher'].id).first()
+        self.assertEqual(client_for(other).get(self.url).status_code, 404)
+        student = Student.objects.filter(enrollments__course=self.data['course']).first()
+        self.assertEqual(client_for(student).get(self.url).status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class JobQueueTests(TestCase):
+    """Jobs are validated on enqueue, retried with backoff and requeued only once their lease runs out."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        use_temporary_media(self)
+        tasks = dict(jobs.TASKS)
+        self.addCleanup(setattr, jobs, 'TASKS', tasks)
+
+    def enqueue(self, client, **body):
+        return client.post(reverse('job_enqueue'), body)
+
+    def test_enqueue_validates_parameters(self):
+        teacher = client_for(self.data['teacher'])
+        course = self.data['course']
+        self.assertEqual(self.enqueue(teacher, kind='export_results').status_code, 400)
+        self.assertEqual(self.enqueue(teacher, kind='export_results', course='1; DROP').status_code, 400)
+        response = self.enqueue(teacher, kind='export_results', course=str(course.id))
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()['id'])
+        self.assertEqual(job.params, {'course': course.id, 'teacher_id': self.data['teacher'].id})
+        # A blank filter is left out
+        job = Job.objects.get(id=self.enqueue(teacher, kind='export_results', course='').json()['id'])
+        self.assertEqual(job.params, {'teacher_id': self.data['teacher'].id})
+
+        self.client.force_login(self.data['admin'])
+        self.assertEqual(self.enqueue(self.client, kind='export_users', role='Student').status_code, 400)
+        self.assertEqual(self.enqueue(self.client, kind='export_users', role='Student', batch='').status_code, 202)
+        self.assertEqual(self.enqueue(teacher, kind='export_users', role='', batch='').status_code, 403)
+        # Tasks that take stored files or row ids are only enqueued by their views
+        for kind in ['import_users', 'delete_user', 'delete_course']:
+            with self.subTest(kind=kind):
+                self.assertEqual(self.enqueue(self.client, kind=kind).status_code, 403)
+
+    def test_run_to_completion(self):
+        job = jobs.enqueue('export_course_stats', user=self.data['admin'])
+        self.assertEqual(jobs.claim_next('test'), job.id)
+        jobs.run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.result), ('succeeded', 100, {'rows': Course.objects.count()}))
+        self.client.force_login(self.data['admin'])
+        self.assertEqual(self.client.get(reverse('job_download', args=[job.id])).status_code, 200)
+
+    def test_failures_are_retried_with_backoff(self):
+        jobs.task('always_fails')(lambda job: 1 / 0)
+        job = jobs.enqueue('always_fails', max_attempts=2)
+        self.assertEqual(jobs.claim_next('test'), job.id)
+        jobs.run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('ZeroDivisionError', job.error)
+        self.assertGreater(job.run_after, timezone.now() + jobs.RETRY_BASE_DELAY / 2)
+        # Not runnable again until the backoff has passed
+        self.assertIsNone(jobs.claim_next('test'))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.claim_next('test'), job.id)
+        jobs.run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_only_expired_leases_are_requeued(self):
+        job = jobs.enqueue('export_course_stats')
+        jobs.claim_next('worker-a')
+        # A long job that never reports progress keeps its lease while the worker renews it
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), (0, 0))
+        self.assertEqual(jobs.renew_leases('worker-b', [job.id]), 0)
+        self.assertEqual(jobs.renew_leases('worker-a', [job.id]), 1)
+
+        Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.requeue_stale(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), ('queued', ''))
+
+        # Out of attempts, an abandoned job fails instead
+        Job.objects.filter(pk=job.pk).update(max_attempts=2)
+        jobs.claim_next('worker-a')
+        Job.objects.filter(pk=job.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        jobs.requeue_stale()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportTests(TestCase):
+    """Sheets are validated row by row; bad rows are reported and the rest imported."""
+
+    header = ['Username', 'Email', 'Password', 'Role', 'Roll No', 'Employee ID']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def csv_file(self, rows, header=None):
+        output = io.StringIO()
+        csv.writer(output).writerows([header or self.header] + rows)
+        return io.BytesIO(output.getvalue().encode())
+
+    def xlsx_file(self, rows):
+        workbook = openpyxl.Workbook()
+        for row in [self.header] + rows:
+            workbook.active.append(row)
+        output = io.BytesIO()
+        workbook.save(output)
+        output.seek(0)
+        return output
+
+    def import_file(self, file, filename):
+        return imports.import_users(imports.read_rows(file, filename))
+
+    def test_csv_rows_are_validated(self):
+        existing = self.data['student']
+        created, errors = self.import_file(self.csv_file([
+            ['new_teacher', 'teacher@example.com', 'secret', 'Teacher', '', 'EMP-1'],
+            ['new_student', 'student@example.com', 'secret', 'Student', 'R-1', ''],
+            ['', '', '', '', '', ''],
+            ['new_student', 'other@example.com', 'secret', 'Student', 'R-2', ''],
+            ['another', 'STUDENT@example.com', 'secret', 'Student', 'R-3', ''],
+            ['clash', 'clash@example.com', 'secret', 'Student', existing.roll_no, ''],
+            ['admin2', 'admin2@example.com', 'secret', 'Admin', '', ''],
+            ['no_roll', 'no_roll@example.com', 'secret', 'Student', '', ''],
+            ['bad_email', 'not an email', 'secret', 'Teacher', '', ''],
+            ['no_password', 'no_password@example.com', '', 'Teacher', '', ''],
+            ['x' * 200, 'long@example.com', 'secret', 'Teacher', '', ''],
+            ['second_teacher', 'second@example.com', 'secret', 'Teacher', '', 'EMP-1'],
+        ]), 'users.csv')
+        self.assertEqual(created, 2)
+        # The blank row 4 is skipped, but keeps its place in the numbering
+        self.assertEqual([(row, message) for row, _, message in errors], [
+            (5, 'username already exists.'),
+            (6, 'email already exists.'),
+            (7, 'roll_no already exists.'),
+            (8, 'role must be one of Teacher, Student.'),
+            (9, 'roll_no is required for students.'),
+            (10, 'email is not a valid address.'),
+            (11, 'password is required.'),
+            (12, 'username is longer than 150 characters.'),
+            (13, 'employee_id already exists.'),
+        ])
+        student = Student.objects.get(user__username='new_student')
+        self.assertEqual(student.roll_no, 'R-1')
+        self.assertTrue(student.user.check_password('secret'))
+        self.assertEqual(Teacher.objects.get(user__username='new_teacher').employee_id, 'EMP-1')
+
+    def test_xlsx_numbers_are_read_as_text(self):
+        created, errors = self.import_file(self.xlsx_file([
+            ['sheet_student', 'sheet@example.com', 'secret', 'Student', 1042, None],
+        ]), 'users.xlsx')
+        self.assertEqual((created, errors), (1, []))
+        self.assertEqual(Student.objects.get(user__username='sheet_student').roll_no, '1042')
+
+    def test_unreadable_sheets(self):
+        cases = [
+            (self.csv_file([], header=['username', 'email']), 'users.csv'),
+            (io.BytesIO(b'username,email,password,role\n\xff\xfe,x,y,z\n'), 'users.csv'),
+            (io.BytesIO(b'not a workbook'), 'users.xlsx'),
+            (io.BytesIO(b''), 'users.txt'),
+        ]
+        for file, filename in cases:
+            with self.subTest(filename=filename):
+                with self.assertRaises(imports.ImportFormatError):
+                    self.import_file(file, filename)
+
+    def test_import_job_reports_errors(self):
+        use_temporary_media(self)
+        path = default_storage.save('imports/users.csv', ContentFile(self.csv_file([
+            ['job_student', 'job@example.com', 'secret', 'Student', 'J-1', ''],
+            ['job_student', 'job2@example.com', 'secret', 'Student', 'J-2', ''],
+        ]).getvalue()))
+        job = jobs.enqueue('import_users', path=path, filename='users.csv')
+        jobs.claim_next('test')
+        jobs.run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('succeeded', {'created': 1, 'errors': 1}))
+        with job.result_file.open('rb') as errors:
+            self.assertEqual(errors.read().decode().splitlines()[1], '3,job_student,username already exists.')
+        self.assertFalse(default_storage.exists(path))
+
+    def test_failed_import_job_deletes_the_sheet(self):
+        use_temporary_media(self)
+        path = default_storage.save('imports/users.csv', ContentFile(self.csv_file([]).getvalue()))
+        job = jobs.enqueue('import_users', max_attempts=1, path=path, filename='users.csv')
+        jobs.claim_next('test')
+        with mock.patch('academic.imports.import_users', side_effect=IntegrityError('boom')):
+            jobs.run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(default_storage.exists(path))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = generate(seed=0, **SCALES['small'])
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def test_requests_are_recorded_per_view(self):
+        client_for(self.data['student']).get(reverse('student_results'))
+        self.client.force_login(self.data['admin'])
+        rows = {row['view']: row for row in self.client.get(reverse('admin_metrics')).context['rows']}
+        self.assertEqual(rows['student_results']['requests'], 1)
+        self.assertGreater(rows['student_results']['queries']['p50'], 0)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_prometheus_token(self):
+        url = reverse('admin_metrics_prometheus')
+        response = self.client.get(url, headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE academic_request_duration_seconds histogram', response.content)
+        for header in ['Bearer wrong', 'Bearer s3cr\u00e9t', '']:
+            with self.subTest(header=header):
+                self.assertNotEqual(self.client.get(url, headers={'Authorization': header}).status_code, 200)
+
+
+class SyntheticDataTests(TestCase):
+    def call(self, *args):
+        call_command('generate_synthetic_data', '--students', '3', '--results', '0', '--attendance', '0',
+                     '--submissions', '0', *args, stdout=io.StringIO())
+
+    def test_courses_need_teachers(self):
+        with self.assertRaises(CommandError):
+            self.call('--teachers', '0', '--courses', '2')
+        with self.assertRaises(CommandError):
+            self.call('--students', '-1')
+        self.assertFalse(Course.objects.exists())
+
+    def test_no_courses(self):
+        self.call('--teachers', '0', '--courses', '0')
+        data = generate(prefix='none', students=2, teachers=1, courses=0, results=5, attendance=5, submissions=5)
+        self.assertEqual((data['course'], data['student']), (None, None))
+        self.assertEqual(data['teacher'].user.username, 'none_t0000')
+        self.assertEqual(data['counts']['enrollments'], 0)
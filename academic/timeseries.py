@@ -0,0 +1,89 @@
+"""
+Time series behind the analytics charts, served as compact JSON.
+
+Each series is one grouped query (marks averaged per exam type and date,
+attendance counted per week with TruncWeek), cached under the version
+stamps of the model it reads. The ETag is derived from the same stamps, so
+a chart that is still current is answered with a 304 before any series
+query runs.
+"""
+import hashlib
+
+from django.db.models import Avg, Count, Q
+from django.db.models.functions import TruncWeek
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .cache import cached, versioned_key
+from .models import Attendance, Results
+
+EXAM_TYPES = [choice for choice, _ in Results.EXAM_TYPE_CHOICES]
+
+# Compact payloads: no spaces, and dates as ISO strings Chart.js can use as labels
+JSON_PARAMS = {'separators': (',', ':')}
+
+
+def marks_series(results):
+    """
+    Average marks per exam type and date, as ``{'dates': [...], 'series':
+    {exam_type: [...]}}`` with one value (or null) per date.
+    """
+    rows = (
+        results.exclude(date=None)
+        .values('date', 'exam_type')
+        .annotate(average=Avg('marks'))
+        .order_by('date')
+    )
+    averages = {(row['date'], row['exam_type']): row['average'] for row in rows}
+    dates = sorted({day for day, _ in averages})
+    return {
+        'dates': [day.isoformat() for day in dates],
+        'series': {
+            exam_type: [
+                round(float(averages[day, exam_type]), 2) if (day, exam_type) in averages else None
+                for day in dates
+            ]
+            for exam_type in EXAM_TYPES
+        },
+    }
+
+
+def attendance_series(attendance):
+    """Attendance per week (starting Monday) as parallel lists of week, rate (%) and records."""
+    rows = (
+        attendance.annotate(week=TruncWeek('date'))
+        .values('week')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(status='Present')))
+        .order_by('week')
+    )
+    weeks, rates, totals = [], [], []
+    for row in rows:
+        weeks.append(row['week'].isoformat())
+        rates.append(round(row['present'] * 100 / row['total'], 1))
+        totals.append(row['total'])
+    return {'weeks': weeks, 'rate': rates, 'total': totals}
+
+
+SERIES = {
+    'marks': (Results, marks_series),
+    'attendance': (Attendance, attendance_series),
+}
+
+
+def series_response(request, kind, owner, queryset):
+    """
+    JSON response with the ``kind`` series of ``queryset``, cached per
+    ``owner`` (a Student or Course) until the underlying model is written to.
+    """
+    model, build = SERIES[kind]
+    name = f'series:{kind}:{owner._meta.label_lower}:{owner.pk}'
+    models = [model]
+    etag = quote_etag(hashlib.sha256(versioned_key(name, models).encode()).hexdigest()[:32])
+    # Private data that changes whenever marks are entered; revalidating is a cheap 304
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    response = get_conditional_response(request, etag=etag, response=HttpResponse(headers=headers))
+    if response.status_code in (304, 412):
+        return response
+    payload, _ = cached(name, models, lambda: build(queryset))
+    return JsonResponse(payload, headers=headers, json_dumps_params=JSON_PARAMS)
@@ -0,0 +1,177 @@
+"""
+Chunked, resumable uploads with content-addressed storage.
+
+A client opens an UploadSession, appends the file in chunks at the offset
+the server last acknowledged, then finalizes it. An interrupted upload
+resumes from UploadSession.offset, so a retry only re-sends the chunk that
+failed. Finalizing hashes the assembled file and moves it to
+blobs/<sha256>, so identical submissions and course files share one copy.
+
+The SHA-256 is computed when the upload is finalized, in one sequential
+pass over the assembled file. hashlib state cannot be saved between
+requests, and hashing at the end lets any worker accept any chunk.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .enrollment import enrolled_assignments
+from .models import Course, CourseFile, Student, Submission, Teacher, UploadSession
+
+CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+READ_BLOCK_SIZE = 1024 * 1024
+
+PARTIAL_DIR = 'uploads/partial'
+BLOB_DIR = 'blobs'
+
+STALE_AFTER = timedelta(days=1)
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def upload_target(kind, target_id, profile):
+    """Return the Assignment or Course an upload attaches to, or None if ``profile`` may not upload there."""
+    if kind == 'submission' and isinstance(profile, Student):
+        return enrolled_assignments(profile).filter(id=target_id).first()
+    if kind == 'course_file' and isinstance(profile, Teacher):
+        return Course.objects.filter(id=target_id, assigned_teacher=profile).first()
+    return None
+
+
+def partial_path(session):
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR, f'{session.pk}.part')
+
+
+def blob_name(sha256, filename):
+    extension = os.path.splitext(filename)[1].lower()[:16]
+    return f'{BLOB_DIR}/{sha256[:2]}/{sha256}{extension}'
+
+
+def start_upload(user, kind, target_id, filename, size):
+    if not 0 < size <= UPLOAD_MAX_SIZE:
+        raise UploadError(f'File size must be between 1 byte and {UPLOAD_MAX_SIZE} bytes.', status=413)
+    filename = os.path.basename(filename.replace('\\', '/'))[:255]
+    if not filename:
+        raise UploadError('A file name is required.')
+    session = UploadSession.objects.create(
+        user=user, kind=kind, target_id=target_id, filename=filename, size=size,
+    )
+    os.makedirs(os.path.dirname(partial_path(session)), exist_ok=True)
+    return session
+
+
+def append_chunk(session, offset, stream, length):
+    """
+    Write ``length`` bytes from ``stream`` at ``offset`` and advance the
+    session. The offset must be the one the server last acknowledged.
+    """
+    if offset != session.offset:
+        raise UploadError('Offset does not match the upload.', status=409, offset=session.offset)
+    if not 0 < length <= CHUNK_MAX_SIZE:
+        raise UploadError(f'Chunks must be between 1 byte and {CHUNK_MAX_SIZE} bytes.', status=413)
+    if offset + length > session.size:
+        raise UploadError('Chunk runs past the declared file size.')
+
+    path = partial_path(session)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    with os.fdopen(fd, 'wb') as partial:
+        partial.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            partial.write(block)
+            remaining -= len(block)
+    if remaining:
+        raise UploadError('Chunk ended before its Content-Length.', offset=session.offset)
+
+    # Only one request can advance past a given offset; a losing duplicate
+    # wrote the same bytes over the same range
+    advanced = UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now(),
+    )
+    if not advanced:
+        session.refresh_from_db(fields=['offset'])
+        raise UploadError('Offset does not match the upload.', status=409, offset=session.offset)
+    session.offset = offset + length
+    return session.offset
+
+
+def store_blob(path, sha256, filename):
+    """Move the assembled file to its content address. Returns (name, deduplicated)."""
+    name = blob_name(sha256, filename)
+    if default_storage.exists(name):
+        os.remove(path)
+        return name, True
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        # Remote storage: copy the file up instead of renaming it into place
+        with open(path, 'rb') as assembled:
+            name = default_storage.save(name, File(assembled))
+        os.remove(path)
+        return name, False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    return name, False
+
+
+def finish_upload(session, profile, target):
+    """Hash and store a completed upload and create its Submission or CourseFile."""
+    if session.offset != session.size:
+        raise UploadError('Upload is incomplete.', status=409, offset=session.offset)
+    # Claim the session before touching the file; a concurrent finalize of the
+    # same upload loses here instead of finding the file already moved
+    claimed = UploadSession.objects.filter(pk=session.pk, offset=session.size, finalizing=False).update(
+        finalizing=True, updated_at=timezone.now(),
+    )
+    if not claimed:
+        raise UploadError('Upload is already being finalized.', status=409)
+    session.finalizing = True
+    path = partial_path(session)
+    digest = hashlib.sha256()
+    with open(path, 'r+b') as assembled:
+        # Drop bytes an abandoned chunk may have written past the last acknowledged offset
+        assembled.truncate(session.size)
+        for block in iter(lambda: assembled.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+    name, deduplicated = store_blob(path, sha256, session.filename)
+
+    fields = {'file': name, 'sha256': sha256, 'original_name': session.filename}
+    if session.kind == 'submission':
+        obj = Submission.objects.create(student=profile, assignment=target, **fields)
+    else:
+        obj = CourseFile.objects.create(course=target, **fields)
+    session.delete()
+    return obj, deduplicated
+
+
+def discard_upload(session):
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def purge_stale_uploads(older_than=STALE_AFTER):
+    """Delete sessions untouched for ``older_than`` and their partial files. Returns the number purged."""
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - older_than)
+    count = 0
+    for session in stale.iterator():
+        discard_upload(session)
+        count += 1
+    return count
@@ -6,22 +6,48 @@ urlpatterns = [
     path('portal-admin/login/', views.admin_login, name='admin_login'),
     path('portal-admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('portal-admin/users/', views.admin_users, name='admin_users'),
+    path('portal-admin/users/export.csv', views.admin_users_export, name='admin_users_export'),
+    path('portal-admin/users/import/', views.admin_users_import, name='admin_users_import'),
     path('portal-admin/courses/', views.admin_courses, name='admin_courses'),
     path('portal-admin/announcements/', views.admin_announcements, name='admin_announcements'),
     path('portal-admin/reports/', views.admin_reports, name='admin_reports'),
+    path('portal-admin/reports/courses.json', views.admin_reports_courses_json, name='admin_reports_courses_json'),
+    path('portal-admin/reports/courses.xlsx', views.admin_reports_export, name='admin_reports_export'),
+    path('portal-admin/metrics/', views.admin_metrics, name='admin_metrics'),
+    path('portal-admin/metrics/prometheus/', views.admin_metrics_prometheus, name='admin_metrics_prometheus'),
     path('teacher/login/', views.teacher_login, name='teacher_login'),
     path('student/login/', views.student_login, name='student_login'),
     path('teacher/dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('logout/', views.logout_view, name='logout'),
     path('teacher/results/', views.teacher_results, name='teacher_results'),
+    path('teacher/results/save/', views.teacher_results_save, name='teacher_results_save'),
+    path('teacher/results/export.xlsx', views.teacher_results_export, name='teacher_results_export'),
     path('teacher/attendance/', views.teacher_attendance, name='teacher_attendance'),
+    path('teacher/attendance/save/', views.teacher_attendance_save, name='teacher_attendance_save'),
+    path('teacher/attendance/export.xlsx', views.teacher_attendance_export, name='teacher_attendance_export'),
+    path('teacher/roster/', views.teacher_roster, name='teacher_roster'),
     path('teacher/assignments/', views.teacher_assignments, name='teacher_assignments'),
     path('teacher/course/<int:course_id>/', views.teacher_course_detail, name='teacher_course_detail'),
+    path('teacher/course/<int:course_id>/marks.json', views.course_marks_series, name='course_marks_series'),
+    path('teacher/course/<int:course_id>/attendance.json', views.course_attendance_series, name='course_attendance_series'),
     path('student/results/', views.student_results, name='student_results'),
     path('student/analytics/', views.student_analytics, name='student_analytics'),
+    path('student/analytics/marks.json', views.student_marks_series, name='student_marks_series'),
+    path('student/analytics/attendance.json', views.student_attendance_series, name='student_attendance_series'),
     path('student/assignments/', views.student_assignments, name='student_assignments'),
     path('student/attendance/', views.student_attendance, name='student_attendance'),
     path('teacher/profile/', views.teacher_profile, name='teacher_profile'),
     path('student/profile/', views.student_profile, name='student_profile'),
+    path('search/', views.search_view, name='search'),
+    path('files/course/<int:file_id>/', views.course_file_download, name='course_file_download'),
+    path('files/assignment/<int:assignment_id>/', views.assignment_file_download, name='assignment_file_download'),
+    path('files/submission/<int:submission_id>/', views.submission_file_download, name='submission_file_download'),
+    path('uploads/', views.upload_start, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('uploads/<uuid:upload_id>/chunk/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
+    path('jobs/', views.job_enqueue, name='job_enqueue'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
 ]
\ No newline at end of file
@@ -1,8 +1,32 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from django.db.models import Avg
-from .models import User, Teacher, Student, Course, Results, Attendance, Announcement, CourseFile, Assignment, Submission
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count
+from django.http import Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_http_methods, require_POST
+from .models import User, Teacher, Student, Course, Enrollment, Results, Attendance, Announcement, CourseFile, Assignment, Submission, UploadSession, Job
+from .enrollment import bulk_enroll, enrolled_assignments, enrolled_students, pending_assignments
+from .analytics import batch_stats, course_stats
+from .gradebook import GRADE_BANDS, build_gradebook, grade_for, save_marks
+from .cache import bump_version
+from .decorators import admin_required, api_login_required, student_required, teacher_required
+from .middleware import get_profile
+from .pagination import keyset_page_from_request
+from .reports import course_stats_queryset
+from .roster import class_choices, filter_roster, roster_page
+from .search import search
+from .stats import get_student_stats, refresh_student_stats
+from .uploads import UploadError
+from . import dashboards, exports, jobs, media, metrics, timeseries, uploads
 
 def home(request):
     return render(request, 'academic/home.html')
@@ -43,132 +67,65 @@ def student_login(request):
             messages.error(request, 'Invalid credentials or not a student.')
     return render(request, 'academic/student_login.html')
 
-def teacher_dashboard(request):
-    if not request.user.is_authenticated or request.user.role != 'Teacher':
-        return redirect('teacher_login')
-    teacher = Teacher.objects.get(user=request.user)
+def teacher_dashboard_post(request, teacher):
     courses = Course.objects.filter(assigned_teacher=teacher)
-    students = Student.objects.all()
-    results = Results.objects.filter(course__in=courses)
-    attendance = Attendance.objects.filter(course__in=courses)
-    announcements = Announcement.objects.filter(teacher=teacher)
-
-    # Prepare student data with results
-    student_data = []
-    for student in students:
-        data = {
-            'id': student.id,
-            'roll_no': student.roll_no,
-            'name': student.user.username,
-            'class_name': student.class_name,
-            'results': {},
-            'attendance_perc': 85,  # Placeholder, calculate properly
-        }
-        student_results = results.filter(student=student)
-        for result in student_results:
-            if result.exam_type == 'CA-I':
-                data['results']['cai'] = {'marks': result.marks, 'date': result.date}
-            elif result.exam_type == 'MSE':
-                data['results']['mse'] = {'marks': result.marks, 'date': result.date}
-            elif result.exam_type == 'CA-II':
-                data['results']['caii'] = {'marks': result.marks, 'date': result.date}
-        # Calculate overall grade
-        marks_list = [float(r['marks']) for r in data['results'].values()]
-        if marks_list:
-            avg = sum(marks_list) / len(marks_list)
-            if avg >= 90:
-                grade = 'A'
-            elif avg >= 80:
-                grade = 'B'
-            elif avg >= 70:
-                grade = 'C'
-            elif avg >= 60:
-                grade = 'D'
-            else:
-                grade = 'F'
-        else:
-            grade = 'N/A'
-        data['grade'] = grade
-        student_data.append(data)
-
+    if 'enter_result' in request.POST:
+        student_id = request.POST['student']
+        course_id = request.POST['course']
+        marks = request.POST['marks']
+        exam_type = request.POST['exam_type']
+        date = request.POST.get('date')
+        course = get_object_or_404(courses, id=course_id)
+        student = get_object_or_404(enrolled_students([course]), id=student_id)
+        Results.objects.update_or_create(
+            student=student, course=course, exam_type=exam_type,
+            defaults={'marks': marks, 'date': date},
+        )
+        messages.success(request, 'Result entered successfully.')
+    elif 'mark_attendance' in request.POST:
+        student_id = request.POST['student']
+        course_id = request.POST['course']
+        date = request.POST['date']
+        status = request.POST['status']
+        course = get_object_or_404(courses, id=course_id)
+        student = get_object_or_404(enrolled_students([course]), id=student_id)
+        Attendance.objects.update_or_create(
+            student=student, course=course, date=date,
+            defaults={'status': status},
+        )
+        messages.success(request, 'Attendance marked successfully.')
+    elif 'send_announcement' in request.POST:
+        message = request.POST['message']
+        Announcement.objects.create(teacher=teacher, message=message)
+        messages.success(request, 'Announcement sent successfully.')
+    return redirect('teacher_dashboard')
+
+@teacher_required
+async def teacher_dashboard(request, teacher):
     if request.method == 'POST':
-        if 'enter_result' in request.POST:
-            student_id = request.POST['student']
-            course_id = request.POST['course']
-            marks = request.POST['marks']
-            exam_type = request.POST['exam_type']
-            date = request.POST.get('date')
-            student = Student.objects.get(id=student_id)
-            course = Course.objects.get(id=course_id)
-            Results.objects.create(student=student, course=course, marks=marks, exam_type=exam_type, date=date)
-            messages.success(request, 'Result entered successfully.')
-        elif 'mark_attendance' in request.POST:
-            student_id = request.POST['student']
-            course_id = request.POST['course']
-            date = request.POST['date']
-            status = request.POST['status']
-            student = Student.objects.get(id=student_id)
-            course = Course.objects.get(id=course_id)
-            Attendance.objects.create(student=student, course=course, date=date, status=status)
-            messages.success(request, 'Attendance marked successfully.')
-        elif 'send_announcement' in request.POST:
-            message = request.POST['message']
-            Announcement.objects.create(teacher=teacher, message=message)
-            messages.success(request, 'Announcement sent successfully.')
-        return redirect('teacher_dashboard')
-    context = {
-        'courses': courses,
-        'student_data': student_data,
-        'results': results,
-        'attendance': attendance,
-        'announcements': announcements,
-    }
-    return render(request, 'academic/teacher_dashboard.html', context)
+        return await sync_to_async(teacher_dashboard_post)(request, teacher)
+    context = await dashboards.teacher_dashboard_data(teacher)
+    return await sync_to_async(render)(request, 'academic/teacher_dashboard.html', context)
 
-def student_dashboard(request):
-    if not request.user.is_authenticated or request.user.role != 'Student':
-        return redirect('student_login')
-    student = Student.objects.get(user=request.user)
-    results = Results.objects.filter(student=student).select_related('course')
-    attendance = Attendance.objects.filter(student=student).select_related('course')
-    # For demo, get all assignments; in real, filter by student's courses
-    assignments = Assignment.objects.all()
-    submissions = Submission.objects.filter(student=student)
-    # Calculate attendance percentage
-    total_att = attendance.count()
-    present = attendance.filter(status='Present').count()
-    att_perc = (present / total_att * 100) if total_att > 0 else 0
-    # Group results
-    internal_results = results.filter(exam_type__in=['CA-I', 'CA-II'])
-    final_results = results.filter(exam_type='MSE')
-    # Calculate averages
-    avg_internal = internal_results.aggregate(avg=Avg('marks'))['avg'] or 0
-    avg_final = final_results.aggregate(avg=Avg('marks'))['avg'] or 0
-    if request.method == 'POST' and 'submit_assignment' in request.POST:
+def student_dashboard_post(request, student):
+    if 'submit_assignment' in request.POST:
         assignment_id = request.POST['submit_assignment']
         file = request.FILES.get('file')
-        assignment = get_object_or_404(Assignment, id=assignment_id)
+        assignment = get_object_or_404(enrolled_assignments(student), id=assignment_id)
         Submission.objects.create(student=student, assignment=assignment, file=file)
         messages.success(request, 'Assignment submitted successfully.')
-        return redirect('student_dashboard')
-    context = {
-        'student': student,
-        'results': results,
-        'internal_results': internal_results,
-        'final_results': final_results,
-        'attendance': attendance,
-        'assignments': assignments,
-        'submissions': submissions,
-        'att_perc': att_perc,
-        'avg_internal': avg_internal,
-        'avg_final': avg_final,
-    }
-    return render(request, 'academic/student_dashboard.html', context)
+    return redirect('student_dashboard')
+
+@student_required
+async def student_dashboard(request, student):
+    if request.method == 'POST':
+        return await sync_to_async(student_dashboard_post)(request, student)
+    context = await dashboards.student_dashboard_data(student)
+    context['student'] = student
+    return await sync_to_async(render)(request, 'academic/student_dashboard.html', context)
 
-def student_results(request):
-    if not request.user.is_authenticated or request.user.role != 'Student':
-        return redirect('student_login')
-    student = Student.objects.get(user=request.user)
+@student_required
+def student_results(request, student):
     results = Results.objects.filter(student=student).select_related('course')
     # Group results
     internal_results = results.filter(exam_type__in=['CA-I', 'CA-II'])
@@ -180,17 +137,11 @@ def student_results(request):
     }
     return render(request, 'academic/student_results.html', context)
 
-def student_analytics(request):
-    if not request.user.is_authenticated or request.user.role != 'Student':
-        return redirect('student_login')
-    student = Student.objects.get(user=request.user)
-    results = Results.objects.filter(student=student).select_related('course')
-    # Group results
-    internal_results = results.filter(exam_type__in=['CA-I', 'CA-II'])
-    final_results = results.filter(exam_type='MSE')
-    # Calculate averages
-    avg_internal = internal_results.aggregate(avg=Avg('marks'))['avg'] or 0
-    avg_final = final_results.aggregate(avg=Avg('marks'))['avg'] or 0
+@student_required
+def student_analytics(request, student):
+    stats = get_student_stats(student)
+    avg_internal = stats.internal_average
+    avg_final = stats.final_average
     # Calculate overall average
     overall_avg = (avg_internal + avg_final) / 2 if (avg_internal + avg_final) > 0 else 0
     context = {
@@ -198,24 +149,26 @@ def student_analytics(request):
         'avg_internal': avg_internal,
         'avg_final': avg_final,
         'overall_avg': overall_avg,
+        'grade': grade_for(overall_avg) if overall_avg else 'N/A',
     }
     return render(request, 'academic/student_analytics.html', context)
 
-def student_assignments(request):
-    if not request.user.is_authenticated or request.user.role != 'Student':
-        return redirect('student_login')
-    student = Student.objects.get(user=request.user)
-    # For demo, get all assignments; in real, filter by student's courses
-    assignments = Assignment.objects.all()
-    submissions = Submission.objects.filter(student=student)
-    # Calculate pending assignments (assignments not submitted by this student)
-    submitted_assignment_ids = submissions.values_list('assignment_id', flat=True)
-    pending_assignments = assignments.exclude(id__in=submitted_assignment_ids)
-    pending_count = pending_assignments.count()
+@student_required(api=True)
+def student_marks_series(request, student):
+    return timeseries.series_response(request, 'marks', student, Results.objects.filter(student=student))
+
+@student_required(api=True)
+def student_attendance_series(request, student):
+    return timeseries.series_response(request, 'attendance', student, Attendance.objects.filter(student=student))
+
+@student_required
+def student_assignments(request, student):
+    assignments = enrolled_assignments(student).select_related('course')
+    submissions = Submission.objects.filter(student=student).select_related('assignment')
     if request.method == 'POST' and 'submit_assignment' in request.POST:
         assignment_id = request.POST['submit_assignment']
         file = request.FILES.get('file')
-        assignment = get_object_or_404(Assignment, id=assignment_id)
+        assignment = get_object_or_404(assignments, id=assignment_id)
         Submission.objects.create(student=student, assignment=assignment, file=file)
         messages.success(request, 'Assignment submitted successfully.')
         return redirect('student_assignments')
@@ -223,23 +176,18 @@ def student_assignments(request):
         'student': student,
         'assignments': assignments,
         'submissions': submissions,
-        'pending_count': pending_count,
+        'pending_count': pending_assignments(student).count(),
     }
     return render(request, 'academic/student_assignments.html', context)
 
-def student_attendance(request):
-    if not request.user.is_authenticated or request.user.role != 'Student':
-        return redirect('student_login')
-    student = Student.objects.get(user=request.user)
+@student_required
+def student_attendance(request, student):
     attendance = Attendance.objects.filter(student=student).select_related('course')
-    # Calculate attendance percentage
-    total_att = attendance.count()
-    present = attendance.filter(status='Present').count()
-    att_perc = (present / total_att * 100) if total_att > 0 else 0
+    stats = get_student_stats(student)
     context = {
         'student': student,
         'attendance': attendance,
-        'att_perc': att_perc,
+        'att_perc': stats.attendance_percentage,
     }
     return render(request, 'academic/student_attendance.html', context)
 
@@ -247,64 +195,181 @@ def logout_view(request):
     logout(request)
     return redirect('home')
 
-def teacher_results(request):
-    if not request.user.is_authenticated or request.user.role != 'Teacher':
-        return redirect('teacher_login')
-    teacher = Teacher.objects.get(user=request.user)
+def course_param(request):
+    """The ``course`` query parameter as an id, or None when missing or malformed."""
+    try:
+        return int(request.GET.get('course', ''))
+    except ValueError:
+        return None
+
+def teacher_roster_page(request, teacher):
+    """Resolve the selected course and the requested page of its filtered roster."""
     courses = Course.objects.filter(assigned_teacher=teacher)
-    students = Student.objects.all()
-    results = Results.objects.filter(course__in=courses)
-    student_data = []
-    for student in students:
-        data = {
-            'id': student.id,
-            'roll_no': student.roll_no,
-            'name': student.user.username,
-            'class_name': student.class_name,
-            'results': {},
-        }
-        student_results = results.filter(student=student)
-        for result in student_results:
-            if result.exam_type == 'CA-I':
-                data['results']['cai'] = {'marks': result.marks, 'date': result.date}
-            elif result.exam_type == 'MSE':
-                data['results']['mse'] = {'marks': result.marks, 'date': result.date}
-            elif result.exam_type == 'CA-II':
-                data['results']['caii'] = {'marks': result.marks, 'date': result.date}
-        marks_list = [float(r['marks']) for r in data['results'].values()]
-        if marks_list:
-            avg = sum(marks_list) / len(marks_list)
-            if avg >= 90:
-                grade = 'A'
-            elif avg >= 80:
-                grade = 'B'
-            elif avg >= 70:
-                grade = 'C'
-            elif avg >= 60:
-                grade = 'D'
-            else:
-                grade = 'F'
-        else:
-            grade = 'N/A'
-        data['grade'] = grade
-        student_data.append(data)
-    context = {'student_data': student_data}
+    selected_course = None
+    course_id = course_param(request)
+    if course_id is not None:
+        selected_course = courses.filter(id=course_id).first()
+    if selected_course is None:
+        selected_course = courses.first()
+    enrolled = enrolled_students([selected_course] if selected_course else [])
+    query = request.GET.get('q', '').strip()
+    class_name = request.GET.get('class_name', '')
+    students = filter_roster(enrolled, query, class_name).select_related('user')
+    context = {
+        'courses': courses,
+        'selected_course': selected_course,
+        'query': query,
+        'class_name': class_name,
+        'roster': roster_page(students, request.GET.get('page')),
+    }
+    return enrolled, context
+
+def results_grid(selected_course, roster):
+    if selected_course is None:
+        return []
+    rows = build_gradebook([selected_course], Student.objects.filter(id__in=[student.id for student in roster]))
+    ranks = course_stats(selected_course)['ranks']
+    for row in rows:
+        row['percentile'] = ranks.get(row['id'])
+    return rows
+
+@teacher_required
+def teacher_results(request, teacher):
+    enrolled, context = teacher_roster_page(request, teacher)
+    context['student_data'] = results_grid(context['selected_course'], context['roster'])
+    context['class_names'] = class_choices(enrolled)
+    context['class_stats'] = course_stats(context['selected_course']) if context['selected_course'] else None
+    context['grade_bands'] = GRADE_BANDS
     return render(request, 'academic/teacher_results.html', context)
 
-def teacher_attendance(request):
-    if not request.user.is_authenticated or request.user.role != 'Teacher':
-        return redirect('teacher_login')
-    teacher = Teacher.objects.get(user=request.user)
+@teacher_required
+def teacher_results_export(request, teacher):
+    courses = Course.objects.filter(assigned_teacher=teacher)
+    course_id = course_param(request)
+    if course_id is not None:
+        courses = courses.filter(id=course_id)
+    return exports.xlsx_response(
+        'students_results.xlsx', 'Students', exports.RESULTS_HEADER, exports.results_rows(courses),
+    )
+
+@require_POST
+@teacher_required(api=True)
+def teacher_results_save(request, teacher):
+    try:
+        rows = json.loads(request.body)['rows']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Malformed marks payload.'}, status=400)
+    if not isinstance(rows, list):
+        return JsonResponse({'error': 'rows must be a list.'}, status=400)
     courses = Course.objects.filter(assigned_teacher=teacher)
-    students = Student.objects.all()
-    attendance = Attendance.objects.filter(course__in=courses)
-    context = {'students': students, 'attendance': attendance}
+    saved, errors = save_marks(rows, courses)
+    return JsonResponse({'saved': saved, 'errors': errors})
+
+@teacher_required
+def teacher_attendance(request, teacher):
+    enrolled, context = teacher_roster_page(request, teacher)
+    context['students'] = context['roster']
+    context['class_names'] = class_choices(enrolled)
+    context['attendance'] = keyset_page_from_request(
+        request,
+        Attendance.objects.filter(course__in=context['courses']).select_related('student__user', 'course'),
+        'date',
+    )
     return render(request, 'academic/teacher_attendance.html', context)
 
-def teacher_course_detail(request, course_id):
-    if not request.user.is_authenticated or request.user.role != 'Teacher':
-        return redirect('teacher_login')
-    course = get_object_or_404(Course, id=course_id, assigned_teacher__user=request.user)
+@teacher_required(api=True)
+def teacher_roster(request, teacher):
+    grid = request.GET.get('grid')
+    if grid not in ('results', 'attendance'):
+        return JsonResponse({'error': 'grid must be results or attendance.'}, status=400)
+    _, context = teacher_roster_page(request, teacher)
+    roster = context['roster']
+    if grid == 'results':
+        context['student_data'] = results_grid(context['selected_course'], roster)
+    else:
+        context['students'] = roster
+    return JsonResponse({
+        'html': render_to_string(f'academic/includes/{grid}_rows.html', context, request),
+        'page': roster.number,
+        'num_pages': roster.paginator.num_pages,
+        'count': roster.paginator.count,
+        'has_next': roster.has_next(),
+        'has_previous': roster.has_previous(),
+    })
+
+@teacher_required
+def teacher_attendance_export(request, teacher):
+    courses = Course.objects.filter(assigned_teacher=teacher)
+    return exports.xlsx_response(
+        'attendance_report.xlsx', 'Attendance Report', exports.ATTENDANCE_HEADER, exports.attendance_rows(courses),
+    )
+
+@require_POST
+@teacher_required(api=True)
+def teacher_attendance_save(request, teacher):
+    try:
+        payload = json.loads(request.body)
+        course_id = int(payload['course'])
+        date = parse_date(payload['date'])
+        entries = payload['entries']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Malformed roll-call payload.'}, status=400)
+    if date is None or not isinstance(entries, list) or not entries:
+        return JsonResponse({'error': 'A date and at least one entry are required.'}, status=400)
+
+    course = Course.objects.filter(id=course_id, assigned_teacher=teacher).first()
+    if course is None:
+        return JsonResponse({'error': 'Course not found.'}, status=404)
+
+    valid_statuses = {value for value, _ in Attendance.STATUS_CHOICES}
+    statuses = {}
+    for entry in entries:
+        try:
+            student_id = int(entry['student_id'])
+            status = entry['status']
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'Each entry needs a student_id and a status.'}, status=400)
+        if not isinstance(status, str) or status not in valid_statuses:
+            return JsonResponse({'error': f'Invalid status {status!r} for student {student_id}.'}, status=400)
+        statuses[student_id] = status
+
+    known_ids = set(enrolled_students([course]).filter(id__in=statuses).values_list('id', flat=True))
+    unknown_ids = sorted(set(statuses) - known_ids)
+    if unknown_ids:
+        return JsonResponse({'error': 'Students not enrolled in this course.', 'student_ids': unknown_ids}, status=400)
+
+    # Upsert the whole class at once so resubmitting the same day is a no-op
+    with transaction.atomic():
+        existing = dict(
+            Attendance.objects.filter(course=course, date=date, student_id__in=statuses)
+            .values_list('student_id', 'status')
+        )
+        changed = [
+            Attendance(student_id=student_id, course=course, date=date, status=status)
+            for student_id, status in statuses.items()
+            if existing.get(student_id) != status
+        ]
+        Attendance.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=['student', 'course', 'date'],
+            update_fields=['status'],
+        )
+        refresh_student_stats([att.student_id for att in changed])
+        bump_version(Attendance)
+    created = len(set(statuses) - set(existing))
+
+    return JsonResponse({
+        'course': course.id,
+        'date': date.isoformat(),
+        'created': created,
+        'updated': len(changed) - created,
+        'unchanged': len(statuses) - len(changed),
+    })
+
+@teacher_required
+def teacher_course_detail(request, teacher, course_id):
+    course = get_object_or_404(Course, id=course_id, assigned_teacher=teacher)
     if request.method == 'POST':
         if 'update_material' in request.POST:
             material = request.POST['material']
@@ -325,10 +390,18 @@ def teacher_course_detail(request, course_id):
     context = {'course': course, 'files': files}
     return render(request, 'academic/teacher_course_detail.html', context)
 
-def teacher_assignments(request):
-    if not request.user.is_authenticated or request.user.role != 'Teacher':
-        return redirect('teacher_login')
-    teacher = Teacher.objects.get(user=request.user)
+@teacher_required(api=True)
+def course_marks_series(request, teacher, course_id):
+    course = get_object_or_404(Course, id=course_id, assigned_teacher=teacher)
+    return timeseries.series_response(request, 'marks', course, Results.objects.filter(course=course))
+
+@teacher_required(api=True)
+def course_attendance_series(request, teacher, course_id):
+    course = get_object_or_404(Course, id=course_id, assigned_teacher=teacher)
+    return timeseries.series_response(request, 'attendance', course, Attendance.objects.filter(course=course))
+
+@teacher_required
+def teacher_assignments(request, teacher):
     courses = Course.objects.filter(assigned_teacher=teacher)
     
     if request.method == 'POST':
@@ -365,12 +438,13 @@ def teacher_assignments(request):
     }
     return render(request, 'academic/teacher_assignments.html', context)
 
-def teacher_profile(request):
-    if not request.user.is_authenticated or request.user.role != 'Teacher':
-        return redirect('teacher_login')
-    teacher = Teacher.objects.get(user=request.user)
+@teacher_required
+def teacher_profile(request, teacher):
+    # The resolved profile only carries its id; this page shows every field
+    teacher = Teacher.objects.get(pk=teacher.pk)
+    teacher.user = request.user
     courses = Course.objects.filter(assigned_teacher=teacher)
-    total_students = Student.objects.count()
+    total_students = enrolled_students(courses).count()
     total_assignments = Assignment.objects.filter(course__in=courses).count()
     total_submissions = Submission.objects.filter(assignment__course__in=courses).count()
 
@@ -398,22 +472,15 @@ def teacher_profile(request):
     }
     return render(request, 'academic/teacher_profile.html', context)
 
-def student_profile(request):
-    if not request.user.is_authenticated or request.user.role != 'Student':
-        return redirect('student_login')
-    student = Student.objects.get(user=request.user)
-    results = Results.objects.filter(student=student)
+@student_required
+def student_profile(request, student):
+    # The resolved profile only carries its id; this page shows every field
+    student = Student.objects.get(pk=student.pk)
+    student.user = request.user
+    results = Results.objects.filter(student=student).select_related('course')
     attendance = Attendance.objects.filter(student=student)
-    submissions = Submission.objects.filter(student=student)
-
-    # Calculate attendance percentage
-    total_att = attendance.count()
-    present = attendance.filter(status='Present').count()
-    att_perc = (present / total_att * 100) if total_att > 0 else 0
-
-    # Calculate average marks
-    marks_list = [float(result.marks) for result in results]
-    avg_marks = sum(marks_list) / len(marks_list) if marks_list else 0
+    submissions = Submission.objects.filter(student=student).select_related('assignment')
+    stats = get_student_stats(student)
 
     if request.method == 'POST':
         # Update user information
@@ -439,48 +506,20 @@ def student_profile(request):
         'results': results,
         'attendance': attendance,
         'submissions': submissions,
-        'att_perc': att_perc,
-        'avg_marks': avg_marks,
-        'total_results': results.count(),
+        'att_perc': stats.attendance_percentage,
+        'avg_marks': stats.marks_average,
+        'total_results': stats.results_count,
         'total_submissions': submissions.count(),
     }
     return render(request, 'academic/student_profile.html', context)
 
-def admin_dashboard(request):
-    if not request.user.is_authenticated or request.user.role != 'Admin':
-        return redirect('admin_login')
-
-    # System statistics
-    total_students = Student.objects.count()
-    total_teachers = Teacher.objects.count()
-    total_courses = Course.objects.count()
-    total_assignments = Assignment.objects.count()
-    total_submissions = Submission.objects.count()
-    total_results = Results.objects.count()
-    total_announcements = Announcement.objects.count()
-
-    # Recent activities
-    recent_students = Student.objects.order_by('-user__date_joined')[:5]
-    recent_teachers = Teacher.objects.order_by('-joining_date')[:5]
-    recent_announcements = Announcement.objects.order_by('-date')[:5]
-
-    context = {
-        'total_students': total_students,
-        'total_teachers': total_teachers,
-        'total_courses': total_courses,
-        'total_assignments': total_assignments,
-        'total_submissions': total_submissions,
-        'total_results': total_results,
-        'total_announcements': total_announcements,
-        'recent_students': recent_students,
-        'recent_teachers': recent_teachers,
-        'recent_announcements': recent_announcements,
-    }
-    return render(request, 'academic/admin_dashboard.html', context)
+@admin_required
+async def admin_dashboard(request):
+    context = await dashboards.admin_dashboard_data()
+    return await sync_to_async(render)(request, 'academic/admin_dashboard.html', context)
 
+@admin_required
 def admin_users(request):
-    if not request.user.is_authenticated or request.user.role != 'Admin':
-        return redirect('admin_login')
 
     if request.method == 'POST':
         if 'create_user' in request.POST:
@@ -531,19 +570,33 @@ def admin_users(request):
             user_id = request.POST['user_id']
             user = get_object_or_404(User, id=user_id)
             if user.role != 'Admin':  # Prevent deleting admin users
-                user.delete()
-                messages.success(request, 'User deleted successfully.')
+                # Cascading through results, attendance and submissions can be slow
+                jobs.enqueue('delete_user', user=request.user, user_id=user.id)
+                messages.success(request, f'Deletion of {user.username} has been queued.')
             else:
                 messages.error(request, 'Cannot delete admin users.')
             return redirect('admin_users')
 
-    users = User.objects.all().order_by('-date_joined')
-    context = {'users': users}
+    users = keyset_page_from_request(request, User.objects.all(), 'date_joined')
+    import_jobs = Job.objects.filter(kind='import_users').order_by('-id')[:5]
+    context = {'users': users, 'import_jobs': import_jobs}
     return render(request, 'academic/admin_users.html', context)
 
+@require_POST
+@admin_required
+def admin_users_import(request):
+    sheet = request.FILES.get('sheet')
+    if sheet is None or not sheet.name.lower().endswith(('.xlsx', '.csv')):
+        messages.error(request, 'Choose an .xlsx or .csv file to import.')
+        return redirect('admin_users')
+    # The worker may run on another thread or process, so hand it a stored copy
+    path = default_storage.save(f'imports/{sheet.name}', sheet)
+    job = jobs.enqueue('import_users', user=request.user, max_attempts=1, path=path, filename=sheet.name)
+    messages.success(request, f'Import of {sheet.name} queued as job #{job.id}.')
+    return redirect('admin_users')
+
+@admin_required
 def admin_courses(request):
-    if not request.user.is_authenticated or request.user.role != 'Admin':
-        return redirect('admin_login')
 
     if request.method == 'POST':
         if 'create_course' in request.POST:
@@ -566,18 +619,36 @@ def admin_courses(request):
         elif 'delete_course' in request.POST:
             course_id = request.POST['course_id']
             course = get_object_or_404(Course, id=course_id)
-            course.delete()
-            messages.success(request, 'Course deleted successfully.')
+            jobs.enqueue('delete_course', user=request.user, course_id=course.id)
+            messages.success(request, f'Deletion of {course.course_code} has been queued.')
+            return redirect('admin_courses')
+
+        elif 'enroll_students' in request.POST:
+            course = get_object_or_404(Course, id=request.POST['course_id'])
+            batch = request.POST.get('batch', '').strip()
+            class_name = request.POST.get('class_name', '').strip()
+            roll_nos = request.POST.get('roll_nos', '').replace(',', ' ').split()
+            if not (batch or class_name or roll_nos):
+                messages.error(request, 'Choose a batch, a class or a list of roll numbers to enroll.')
+            else:
+                students = Student.objects.all()
+                if batch:
+                    students = students.filter(batch=batch)
+                if class_name:
+                    students = students.filter(class_name=class_name)
+                if roll_nos:
+                    students = students.filter(roll_no__in=roll_nos)
+                enrolled = bulk_enroll(course, students)
+                messages.success(request, f'{enrolled} students enrolled in {course.course_code}.')
             return redirect('admin_courses')
 
-    courses = Course.objects.all().select_related('assigned_teacher__user')
+    courses = Course.objects.select_related('assigned_teacher__user').annotate(assignment_count=Count('assignment'))
     teachers = Teacher.objects.all().select_related('user')
     context = {'courses': courses, 'teachers': teachers}
     return render(request, 'academic/admin_courses.html', context)
 
+@admin_required
 def admin_announcements(request):
-    if not request.user.is_authenticated or request.user.role != 'Admin':
-        return redirect('admin_login')
 
     if request.method == 'POST':
         if 'create_announcement' in request.POST:
@@ -601,13 +672,12 @@ def admin_announcements(request):
             messages.success(request, 'Announcement deleted successfully.')
             return redirect('admin_announcements')
 
-    announcements = Announcement.objects.all().select_related('teacher__user').order_by('-date')
+    announcements = keyset_page_from_request(request, Announcement.objects.select_related('teacher__user'), 'date')
     context = {'announcements': announcements}
     return render(request, 'academic/admin_announcements.html', context)
 
+@admin_required
 def admin_reports(request):
-    if not request.user.is_authenticated or request.user.role != 'Admin':
-        return redirect('admin_login')
 
     # Generate system reports
     total_students = Student.objects.count()
@@ -615,15 +685,8 @@ def admin_reports(request):
     total_courses = Course.objects.count()
 
     # Course enrollment stats
-    course_stats = []
-    for course in Course.objects.all():
-        student_count = Attendance.objects.filter(course=course).values('student').distinct().count()
-        course_stats.append({
-            'course': course,
-            'students': student_count,
-            'assignments': Assignment.objects.filter(course=course).count(),
-            'submissions': Submission.objects.filter(assignment__course=course).count()
-        })
+    sort = request.GET.get('sort', 'course_code')
+    course_stats = Paginator(course_stats_queryset(sort), 25).get_page(request.GET.get('page'))
 
     # Monthly activity (simplified)
     monthly_stats = {
@@ -637,6 +700,272 @@ def admin_reports(request):
         'total_teachers': total_teachers,
         'total_courses': total_courses,
         'course_stats': course_stats,
+        'sort': sort,
         'monthly_stats': monthly_stats,
+        'batch_stats': batch_stats(),
     }
     return render(request, 'academic/admin_reports.html', context)
+
+@admin_required(api=True)
+def admin_reports_courses_json(request):
+    try:
+        per_page = max(1, min(int(request.GET.get('per_page', 25)), 500))
+    except ValueError:
+        per_page = 25
+    page = Paginator(course_stats_queryset(request.GET.get('sort', 'course_code')), per_page).get_page(
+        request.GET.get('page')
+    )
+    return JsonResponse({
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'count': page.paginator.count,
+        'results': [
+            {
+                'id': course.id,
+                'course_code': course.course_code,
+                'course_name': course.course_name,
+                'teacher': course.assigned_teacher.user.username,
+                'students': course.students,
+                'assignments': course.assignments,
+                'submissions': course.submissions,
+            }
+            for course in page
+        ],
+    })
+
+@admin_required
+def admin_reports_export(request):
+    return exports.xlsx_response(
+        'course_statistics.xlsx', 'Course Statistics', exports.COURSE_STATS_HEADER, exports.course_stats_rows(),
+    )
+
+@admin_required
+def admin_metrics(request):
+    context = {
+        'rows': metrics.summary(),
+        'since': metrics.registry.started_at,
+    }
+    return render(request, 'academic/admin_metrics.html', context)
+
+def admin_metrics_prometheus(request):
+    # Scrapers authenticate with METRICS_TOKEN; people with their admin session
+    if not metrics.token_allowed(request) and not (request.user.is_authenticated and request.user.role == 'Admin'):
+        return HttpResponse('Forbidden.\n', status=403, content_type='text/plain')
+    return HttpResponse(metrics.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_required
+def admin_users_export(request):
+    rows = exports.user_rows(role=request.GET.get('role'), batch=request.GET.get('batch'))
+    return exports.csv_response('users.csv', exports.USERS_HEADER, rows)
+
+# Deeper pages are clamped; nobody pages past the first few thousand hits
+MAX_SEARCH_PAGE = 500
+
+SEARCH_URLS = {
+    'Teacher': {'course': 'teacher_course_detail'},
+}
+
+def search_scope(request):
+    """The courses and announcements the user may find; None leaves a kind unrestricted."""
+    role = request.user.role
+    if role == 'Admin':
+        return None, None
+    profile = get_profile(request)
+    if role == 'Teacher' and profile:
+        return Course.objects.filter(assigned_teacher=profile), Announcement.objects.filter(teacher=profile)
+    if role == 'Student' and profile:
+        # The student's courses, and what their teachers have announced
+        courses = Course.objects.filter(id__in=Enrollment.objects.filter(student=profile).values('course_id'))
+        return courses, Announcement.objects.filter(teacher_id__in=courses.values('assigned_teacher_id'))
+    return Course.objects.none(), Announcement.objects.none()
+
+@api_login_required
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, min(int(request.GET.get('page', 1)), MAX_SEARCH_PAGE))
+        per_page = max(1, min(int(request.GET.get('per_page', 20)), 100))
+    except ValueError:
+        page, per_page = 1, 20
+    courses, announcements = search_scope(request)
+    hits, has_next = search(
+        query, limit=per_page, offset=(page - 1) * per_page, courses=courses, announcements=announcements,
+    )
+    url_names = SEARCH_URLS.get(request.user.role, {})
+    for hit in hits:
+        url_name = url_names.get(hit['kind'])
+        hit['url'] = reverse(url_name, args=[hit['id']]) if url_name else None
+    return JsonResponse({'query': query, 'page': page, 'has_next': has_next, 'results': hits})
+
+def upload_error_response(error):
+    return JsonResponse({'error': str(error), **error.extra}, status=error.status)
+
+@require_POST
+@api_login_required
+def upload_start(request):
+    try:
+        payload = json.loads(request.body)
+        kind = payload['kind']
+        target_id = int(payload['target'])
+        filename = str(payload['filename'])
+        size = int(payload['size'])
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Malformed upload request.'}, status=400)
+    if uploads.upload_target(kind, target_id, get_profile(request)) is None:
+        return JsonResponse({'error': 'You cannot upload files there.'}, status=403)
+    try:
+        session = uploads.start_upload(request.user, kind, target_id, filename, size)
+    except UploadError as error:
+        return upload_error_response(error)
+    return JsonResponse({
+        'id': str(session.pk),
+        'offset': session.offset,
+        'size': session.size,
+        'chunk_size': uploads.CHUNK_MAX_SIZE,
+    }, status=201)
+
+@require_http_methods(['GET', 'DELETE'])
+@api_login_required
+def upload_status(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    if request.method == 'DELETE':
+        if session.finalizing:
+            return upload_error_response(UploadError('Upload is already being finalized.', status=409))
+        uploads.discard_upload(session)
+        return JsonResponse({'deleted': True})
+    return JsonResponse({'id': str(session.pk), 'offset': session.offset, 'size': session.size})
+
+@require_POST
+@api_login_required
+def upload_chunk(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        offset = int(request.GET['offset'])
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'An offset and a Content-Length are required.'}, status=400)
+    try:
+        offset = uploads.append_chunk(session, offset, request, length)
+    except UploadError as error:
+        return upload_error_response(error)
+    return JsonResponse({'offset': offset, 'size': session.size})
+
+@require_POST
+@api_login_required
+def upload_finalize(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    profile = get_profile(request)
+    target = uploads.upload_target(session.kind, session.target_id, profile)
+    if target is None:
+        return JsonResponse({'error': 'You cannot upload files there.'}, status=403)
+    size = session.size
+    try:
+        obj, deduplicated = uploads.finish_upload(session, profile, target)
+    except UploadError as error:
+        return upload_error_response(error)
+    return JsonResponse({
+        'id': obj.id,
+        'sha256': obj.sha256,
+        'size': size,
+        'deduplicated': deduplicated,
+    }, status=201)
+
+def job_payload(job):
+    payload = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': job.result,
+        'status_url': reverse('job_status', args=[job.id]),
+        'download_url': None,
+    }
+    if job.status == 'succeeded' and job.result_file:
+        payload['download_url'] = reverse('job_download', args=[job.id])
+    return payload
+
+def get_user_job(request, job_id):
+    job = get_object_or_404(Job, id=job_id)
+    if request.user.role != 'Admin' and job.created_by_id != request.user.id:
+        raise Http404('Job not found.')
+    return job
+
+@require_POST
+@api_login_required
+def job_enqueue(request):
+    kind = request.POST.get('kind', '')
+    spec = jobs.TASKS.get(kind)
+    if spec is None or request.user.role not in spec['roles']:
+        return JsonResponse({'error': 'You cannot run that job.'}, status=403)
+    params = {}
+    for name, parse in spec['params'].items():
+        if name not in request.POST:
+            return JsonResponse({'error': f'Missing parameter {name}.'}, status=400)
+        value = request.POST[name].strip()
+        # A blank filter means all rows
+        if not value:
+            continue
+        try:
+            params[name] = parse(value)
+        except ValueError:
+            return JsonResponse({'error': f'Invalid value for {name}.'}, status=400)
+    if request.user.role == 'Teacher':
+        profile = get_profile(request)
+        if profile is None:
+            return JsonResponse({'error': 'Teacher profile not found.'}, status=403)
+        params['teacher_id'] = profile.id
+    job = jobs.enqueue(kind, user=request.user, **params)
+    return JsonResponse(job_payload(job), status=202)
+
+@api_login_required
+def job_status(request, job_id):
+    return JsonResponse(job_payload(get_user_job(request, job_id)))
+
+def job_download(request, job_id):
+    if not request.user.is_authenticated:
+        return redirect('home')
+    job = get_user_job(request, job_id)
+    if job.status != 'succeeded' or not job.result_file:
+        raise Http404('File not found.')
+    try:
+        return media.serve_file(request, job.result_file, as_attachment=True)
+    except FileNotFoundError:
+        raise Http404('File not found.')
+
+def download_file(request, fieldfile, course_id, filename=None, sha256='', allowed=None):
+    if not request.user.is_authenticated:
+        return redirect('home')
+    if allowed is None:
+        allowed = media.can_access_course(request.user, get_profile(request), course_id)
+    if not allowed or not fieldfile:
+        raise Http404('File not found.')
+    try:
+        return media.serve_file(
+            request, fieldfile, filename=filename, sha256=sha256, as_attachment='download' in request.GET,
+        )
+    except FileNotFoundError:
+        raise Http404('File not found.')
+
+def course_file_download(request, file_id):
+    course_file = get_object_or_404(CourseFile, id=file_id)
+    return download_file(
+        request, course_file.file, course_file.course_id,
+        filename=course_file.original_name or None, sha256=course_file.sha256,
+    )
+
+def assignment_file_download(request, assignment_id):
+    assignment = get_object_or_404(Assignment, id=assignment_id)
+    return download_file(request, assignment.file, assignment.course_id)
+
+def submission_file_download(request, submission_id):
+    submission = get_object_or_404(Submission.objects.select_related('assignment'), id=submission_id)
+    allowed = None
+    # Students may only fetch their own submissions, not their classmates'
+    if request.user.is_authenticated and request.user.role == 'Student':
+        profile = get_profile(request)
+        allowed = profile is not None and submission.student_id == profile.id
+    return download_file(
+        request, submission.file, submission.assignment.course_id,
+        filename=submission.original_name or None, sha256=submission.sha256, allowed=allowed,
+    )
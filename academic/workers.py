@@ -0,0 +1,21 @@
+"""
+Entry points for process pools (run_workers and the bulk user import).
+
+Spawned worker processes unpickle these functions before Django is set up,
+so this module must not import models at load time.
+"""
+
+
+def init_process():
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    from .jobs import run_job
+    run_job(job_id)
+
+
+def hash_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,11 +44,13 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'academic.User'
 
 MIDDLEWARE = [
+    'academic.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'academic.middleware.RoleProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +59,7 @@ ROOT_URLCONF = 'portal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'academic.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,11 +77,70 @@ WSGI_APPLICATION = 'portal.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite by default, tuned by academic.db with SQLITE_PRAGMAS below. Set
+# DATABASE_ENGINE=postgresql (and the POSTGRES_* variables) to use a pooled
+# PostgreSQL server instead; see DEPLOYMENT.md.
+
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'portal'),
+            'USER': os.environ.get('POSTGRES_USER', 'portal'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # The psycopg pool hands connections out per request, so CONN_MAX_AGE stays 0
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Keep connections open between requests; set 0 under ASGI
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so busy_timeout
+                # applies instead of failing when a reader later tries to write
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    # Negative sizes are in KiB: 64 MiB of page cache per connection
+    'cache_size': -65536,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
 
-DATABASES = {
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; with several workers switch to
+# 'django.core.cache.backends.filebased.FileBasedCache' (LOCATION a shared
+# directory) so version bumps are seen by every worker.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'academic-portal',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -123,6 +185,18 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded files are only served through the permission-checked views in
+# academic.media. Set MEDIA_ACCEL to 'x-sendfile' (Apache, lighttpd) or
+# 'x-accel-redirect' (nginx) to let the front proxy send the bytes; for nginx,
+# map MEDIA_ACCEL_PREFIX to MEDIA_ROOT in an internal location.
+MEDIA_ACCEL = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Per-view request metrics are shown to admins at /portal-admin/metrics/.
+# Prometheus can scrape /portal-admin/metrics/prometheus/ by sending
+# 'Authorization: Bearer <METRICS_TOKEN>'; leave it None to require an admin login.
+METRICS_TOKEN = None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 